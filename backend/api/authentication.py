@@ -0,0 +1,146 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.cache import ExpiringLocalCache
+from foodgram.metrics import count_cache
+from recipes import catalogue
+from recipes.counters import COUNTERS
+from users.models import User
+
+local_cache = ExpiringLocalCache(
+    settings.AUTH_TOKEN_LOCAL_CACHE_SIZE, settings.AUTH_TOKEN_LOCAL_TTL
+)
+counters = Counter()
+counters_lock = threading.Lock()
+
+# Счётчики меняются через F() в обход экземпляра. У пользователя из кеша они
+# не загружаются, поэтому save() без update_fields пишет только загруженные
+# поля и не возвращает счётчикам устаревшие значения.
+USER_COUNTERS = tuple(
+    f'user__{field}' for model, field, *_ in COUNTERS if model is User
+)
+
+
+def shared_key(key):
+    """Ключ общего кеша: сам токен в кеш не попадает, только его хеш."""
+    return 'auth:token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def generation_key(key):
+    """
+    Поколение токена: запись общего кеша действительна, только если
+    записана в текущем поколении. Поколение читается до запроса к базе,
+    поэтому запись из данных до сброса не переживает сброс.
+    """
+    return shared_key(key) + ':generation'
+
+
+def count(event):
+    with counters_lock:
+        counters[event] += 1
+    count_cache('auth_token', event)
+
+
+def stats():
+    """Попадания в кеши токенов этого процесса."""
+    with counters_lock:
+        local_hits = counters['local_hits']
+        shared_hits = counters['shared_hits']
+        misses = counters['misses']
+    total = local_hits + shared_hits + misses
+    return {
+        'local_hits': local_hits,
+        'shared_hits': shared_hits,
+        'misses': misses,
+        'hit_ratio': (local_hits + shared_hits) / total if total else None,
+        'local_size': len(local_cache.entries),
+    }
+
+
+def invalidate(keys):
+    cache.set_many(
+        {generation_key(key): time.time_ns() for key in keys}, None
+    )
+    cache.delete_many([shared_key(key) for key in keys])
+    for key in keys:
+        local_cache.delete(key)
+
+
+def invalidate_on_commit(keys):
+    """Сбрасывает токены после фиксации транзакции, чтобы кеш не опередил
+    базу."""
+    keys = list(keys)
+    transaction.on_commit(lambda: invalidate(keys))
+
+
+def detached(token):
+    """
+    (пользователь, токен) — копии закешированных: запрос может менять их
+    атрибуты, не затрагивая другие запросы процесса.
+    """
+    user = copy.copy(token.user)
+    token = copy.copy(token)
+    token.user = user
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, запоминающий токен вместе с пользователем.
+
+    Сначала проверяется LRU процесса, затем общий кеш Django и только
+    потом база. Записи сбрасываются после фиксации удаления токена и
+    сохранения пользователя; в других процессах LRU устаревает не дольше
+    AUTH_TOKEN_LOCAL_TTL секунд.
+    """
+
+    def authenticate_credentials(self, key):
+        # Сброс в LocMemCache не доходит до других процессов: отозванный
+        # токен принимался бы ими до истечения записи.
+        if not catalogue.is_cache_shared():
+            return detached(self.load_token(key))
+        token = local_cache.get(key)
+        if token is not None:
+            count('local_hits')
+            return detached(token)
+        entries = cache.get_many([shared_key(key), generation_key(key)])
+        generation = entries.get(generation_key(key))
+        if generation is None:
+            generation = cache.get_or_set(
+                generation_key(key), time.time_ns, None
+            )
+        entry = entries.get(shared_key(key))
+        if entry is not None and entry[0] == generation:
+            count('shared_hits')
+            token = entry[1]
+        else:
+            count('misses')
+            token = self.load_token(key)
+            cache.set(
+                shared_key(key),
+                (generation, token),
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            )
+        local_cache.set(key, token)
+        return detached(token)
+
+    def load_token(self, key):
+        try:
+            token = self.get_model().objects.select_related('user').defer(
+                *USER_COUNTERS
+            ).get(key=key)
+        except self.get_model().DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token
@@ -0,0 +1,152 @@
+import random
+
+from recipes import catalogue, counters, feed, shopping_list
+from recipes.models import (Cart, FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredientAmount, Tag)
+from recipes.search import ingredient_index
+from users.models import Subscription, User
+
+SIZES = {
+    'small': {
+        'users': 10,
+        'recipes': 30,
+        'ingredients': 50,
+        'ingredients_per_recipe': 5,
+        'favorites': 10,
+        'carts': 6,
+        'subscriptions': 5,
+    },
+    'medium': {
+        'users': 100,
+        'recipes': 500,
+        'ingredients': 500,
+        'ingredients_per_recipe': 10,
+        'favorites': 100,
+        'carts': 30,
+        'subscriptions': 50,
+    },
+    'large': {
+        'users': 500,
+        'recipes': 3000,
+        'ingredients': 2000,
+        'ingredients_per_recipe': 15,
+        'favorites': 500,
+        'carts': 100,
+        'subscriptions': 200,
+    },
+}
+
+TAGS = (
+    ('Завтрак', '#FFFF00', 'breakfast'),
+    ('Обед', '#FF0000', 'lunch'),
+    ('Ужин', '#008000', 'dinner'),
+    ('Десерт', '#0000FF', 'dessert'),
+)
+
+WORDS = (
+    'сыр', 'томат', 'мука', 'соль', 'сахар', 'масло', 'курица', 'рис',
+    'лук', 'чеснок', 'перец', 'молоко', 'яйцо', 'говядина', 'гриб',
+    'морковь', 'картофель', 'капуста', 'укроп', 'лимон', 'мед', 'орех',
+)
+
+UNITS = ('г', 'кг', 'мл', 'шт.', 'ст. л.', 'по вкусу')
+
+BENCHMARK_IMAGE = 'recipes/images/benchmark.png'
+
+
+def _bulk_create(model, objects):
+    """bulk_create, возвращающий объекты с первичными ключами."""
+    created = model.objects.bulk_create(objects)
+    if created and created[0].pk is None:
+        return list(model.objects.order_by('pk'))
+    return created
+
+
+def seed(size='small', seed_value=0):
+    """Заполняет пустую базу синтетическими данными заданного размера."""
+    spec = SIZES[size]
+    rnd = random.Random(seed_value)
+
+    users = _bulk_create(User, (
+        User(
+            username=f'user{number}',
+            email=f'user{number}@foodgram.test',
+            first_name=f'Имя{number}',
+            last_name=f'Фамилия{number}',
+            password='!',
+        )
+        for number in range(spec['users'])
+    ))
+    tags = _bulk_create(Tag, (
+        Tag(name=name, color=color, slug=slug) for name, color, slug in TAGS
+    ))
+    ingredients = _bulk_create(Ingredient, (
+        Ingredient(
+            name=f'{rnd.choice(WORDS)} {rnd.choice(WORDS)} {number}',
+            measurement_unit=rnd.choice(UNITS),
+        )
+        for number in range(spec['ingredients'])
+    ))
+    recipes = _bulk_create(Recipe, (
+        Recipe(
+            author=rnd.choice(users),
+            name=f'{rnd.choice(WORDS).capitalize()} с '
+                 f'{rnd.choice(WORDS)} {number}',
+            text=' '.join(rnd.choice(WORDS) for _ in range(30)),
+            image=BENCHMARK_IMAGE,
+            cooking_time=rnd.randint(1, 180),
+        )
+        for number in range(spec['recipes'])
+    ))
+
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in rnd.sample(tags, rnd.randint(1, 2))
+    )
+    RecipeIngredientAmount.objects.bulk_create(
+        RecipeIngredientAmount(
+            recipe=recipe,
+            ingredient=ingredient,
+            amount=rnd.randint(1, 500),
+        )
+        for recipe in recipes
+        for ingredient in rnd.sample(
+            ingredients, spec['ingredients_per_recipe']
+        )
+    )
+
+    main_user = users[0]
+    FavoriteRecipe.objects.bulk_create(
+        FavoriteRecipe(user=main_user, recipe=recipe)
+        for recipe in rnd.sample(recipes, spec['favorites'])
+    )
+    Cart.objects.bulk_create(
+        Cart(user=main_user, recipe=recipe)
+        for recipe in rnd.sample(recipes, spec['carts'])
+    )
+    shopping_list.rebuild()
+    ingredient_index.invalidate()
+    catalogue.bump_version(catalogue.TAGS)
+    catalogue.bump_versions(catalogue.recipe_pages(Recipe.objects.all()))
+    Subscription.objects.bulk_create(
+        Subscription(user=main_user, author=author)
+        for author in rnd.sample(users[1:], spec['subscriptions'])
+    )
+    counters.reconcile()
+    feed.rebuild()
+    admin = User.objects.create_superuser(
+        email='admin@benchmark.ru',
+        username='benchmark_admin',
+        password='benchmark',
+        first_name='Admin',
+        last_name='Admin',
+    )
+    return {
+        'admin': admin,
+        'user': main_user,
+        'author': recipes[0].author,
+        'recipe': recipes[0],
+        'tags': tags,
+        'ingredient': ingredients[0],
+    }
@@ -0,0 +1,304 @@
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.benchmarks.runner import url_params
+
+# Запросы, чьи querysets проверяются: RecipeFilter, IngredientFilter,
+# download_shopping_cart и subscriptions. (имя, URL, авторизация)
+AUDITS = (
+    ('recipes-list', '/api/recipes/', True),
+    ('recipes-list-cursor', '/api/recipes/?cursor=&limit=100', True),
+    ('recipes-list-tags', '/api/recipes/?tags={tag}&tags={tag2}', True),
+    ('recipes-list-author', '/api/recipes/?author={author}', True),
+    ('recipes-list-favorited', '/api/recipes/?is_favorited=1', True),
+    ('recipes-list-in-cart', '/api/recipes/?is_in_shopping_cart=1', True),
+    ('ingredients-search', '/api/ingredients/?name={ingredient}', False),
+    ('recipes-download-shopping-cart',
+     '/api/recipes/download_shopping_cart/', True),
+    ('users-subscriptions',
+     '/api/users/subscriptions/?limit=100&recipes_limit=3', True),
+)
+
+TABLE_ALIAS = re.compile(
+    r'(?:FROM|JOIN)\s+"(\w+)"(?:\s+(?:AS\s+)?([A-Z]\d+))?'
+)
+COLUMN = r'(?:"(?P<table>\w+)"|(?P<alias>\b[A-Z]\d+))\."(?P<column>\w+)"'
+OTHER_COLUMN = (
+    r'(?:"(?P<other_table>\w+)"|(?P<other_alias>\b[A-Z]\d+))'
+    r'\."(?P<other_column>\w+)"'
+)
+# Сравнение столбца с параметром запроса.
+FILTERED_COLUMN = re.compile(COLUMN + r'\s*(?:=|<=?|>=?|IN \()\s*%s')
+# Столбец в сравнении со столбцом другой таблицы (условие JOIN).
+JOINED_COLUMN = re.compile(COLUMN + r'\s*=\s*' + OTHER_COLUMN)
+ORDER_BY = re.compile(r'(?:PARTITION BY (?P<partition>[^()]+?) )?ORDER BY ')
+ORDER_COLUMN = re.compile(COLUMN + r'(?:\s+(?P<direction>ASC|DESC))?')
+ORDER_END = re.compile(r'\s+(?:LIMIT|OFFSET|FOR UPDATE)\b')
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+SQLITE_SORT = 'USE TEMP B-TREE FOR'
+
+
+class StatementRecorder:
+    """execute_wrapper, запоминающий выполненные SELECT с параметрами."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            statement = (sql, tuple(params or ()))
+            if statement not in self.statements:
+                self.statements.append(statement)
+        return execute(sql, params, many, context)
+
+
+def record_statements(client, url):
+    recorder = StatementRecorder()
+    with connection.execute_wrapper(recorder):
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return recorder.statements
+
+
+def table_aliases(sql):
+    """{алиас или имя таблицы: таблица} для FROM и JOIN запроса."""
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def column_table(match, aliases):
+    return aliases.get(match['table'] or match['alias'])
+
+
+def filtered_columns(sql, table, aliases, joins=False):
+    """
+    Столбцы таблицы, сравниваемые с параметрами, а при joins — и со
+    столбцами других таблиц, в порядке появления.
+    """
+    columns = []
+    for match in FILTERED_COLUMN.finditer(sql):
+        if column_table(match, aliases) == table:
+            columns.append(match['column'])
+    if joins:
+        for match in JOINED_COLUMN.finditer(sql):
+            for side in ('', 'other_'):
+                if aliases.get(
+                    match[f'{side}table'] or match[f'{side}alias']
+                ) == table:
+                    columns.append(match[f'{side}column'])
+    return list(dict.fromkeys(
+        column for column in columns if column != 'id'
+    ))
+
+
+def clause_end(clause):
+    """Конец ORDER BY: закрывающая скобка подзапроса или LIMIT."""
+    depth = 0
+    for position, char in enumerate(clause):
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if depth < 0:
+            return position
+        if depth == 0 and ORDER_END.match(clause, position):
+            return position
+    return len(clause)
+
+
+def order_columns(sql, aliases):
+    """
+    (таблица, ['-столбец', ...]) последнего ORDER BY вместе с PARTITION BY
+    оконной функции. Для сортировки по выражениям или нескольким таблицам —
+    (None, []).
+    """
+    matches = list(ORDER_BY.finditer(sql))
+    if not matches:
+        return None, []
+    match = matches[-1]
+    clause = sql[match.end():]
+    clause = clause[:clause_end(clause)]
+    if match['partition']:
+        clause = f'{match["partition"]}, {clause}'
+    columns = [
+        (column_table(column, aliases),
+         ('-' if column['direction'] == 'DESC' else '') + column['column'])
+        for column in ORDER_COLUMN.finditer(clause)
+    ]
+    rest = ORDER_COLUMN.sub('', clause).replace(',', '').strip()
+    tables = {table for table, _ in columns}
+    if rest or len(tables) != 1 or None in tables:
+        return None, []
+    return tables.pop(), list(dict.fromkeys(
+        column for _, column in columns
+    ))
+
+
+def walk_postgresql(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from walk_postgresql(child)
+
+
+def postgresql_findings(sql, params, aliases):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0][0]['Plan']
+    for node in walk_postgresql(plan):
+        if node['Node Type'] == 'Seq Scan':
+            yield 'seq_scan', node['Relation Name'], None
+        elif node['Node Type'] == 'Sort':
+            child = node['Plans'][0]
+            yield 'sort', None, child['Actual Rows'] * child['Actual Loops']
+
+
+def sqlite_findings(sql, params, aliases):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        details = [row[3] for row in cursor.fetchall()]
+    for detail in details:
+        match = SQLITE_SCAN.match(detail)
+        if match and match[1] in aliases:
+            yield 'seq_scan', aliases[match[1]], None
+        elif detail.startswith(SQLITE_SORT):
+            yield 'sort', None, None
+
+
+FINDINGS = {
+    'postgresql': postgresql_findings,
+    'sqlite': sqlite_findings,
+}
+
+
+def table_rows():
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        rows = {}
+        for table in tables:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+            )
+            rows[table] = cursor.fetchone()[0]
+    return rows
+
+
+def existing_indexes(table):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        constraint['columns'] for constraint in constraints.values()
+        if constraint['index'] or constraint['unique']
+        or constraint['primary_key']
+    ]
+
+
+def is_covered(table, columns):
+    """Есть ли индекс, начинающийся с этих столбцов."""
+    names = [column.lstrip('-') for column in columns]
+    return any(
+        index[:len(names)] == names for index in existing_indexes(table)
+    )
+
+
+def models_by_table():
+    return {
+        model._meta.db_table: model
+        for model in apps.get_models(include_auto_created=True)
+    }
+
+
+def index_definition(model, columns):
+    """models.Index для модели; столбцы *_id заменяются именами полей."""
+    fields = {
+        field.column: field.name for field in model._meta.concrete_fields
+    }
+    names = [
+        ('-' if column.startswith('-') else '')
+        + fields.get(column.lstrip('-'), column.lstrip('-'))
+        for column in columns
+    ]
+    return f'{model._meta.label}: models.Index(fields={names!r})'
+
+
+def audit_statement(sql, params, rows, min_rows):
+    """
+    Последовательные чтения таблиц от min_rows строк и сортировки
+    (на PostgreSQL — от min_rows строк) с предлагаемыми индексами.
+    """
+    aliases = table_aliases(sql)
+    issues = []
+    for kind, table, sorted_rows in FINDINGS[connection.vendor](
+        sql, params, aliases
+    ):
+        if kind == 'seq_scan':
+            columns = filtered_columns(sql, table, aliases, joins=True)
+            # Без условий таблица читается целиком, индекс не поможет.
+            if rows.get(table, 0) < min_rows or not columns:
+                continue
+        else:
+            order_table, order = order_columns(sql, aliases)
+            # Сортировку по выражениям или нескольким таблицам не с чем
+            # сопоставить: индекс для неё не предложить.
+            if order_table is None:
+                continue
+            if sorted_rows is None:
+                sorted_rows = rows.get(order_table, 0)
+            if sorted_rows < min_rows:
+                continue
+            table = order_table
+            filters = [
+                column for column in filtered_columns(sql, table, aliases)
+                if column not in {name.lstrip('-') for name in order}
+            ]
+            # SQLite не сообщает число строк: сортировка строк,
+            # отобранных по индексу, считается дешёвой.
+            if (connection.vendor != 'postgresql' and filters
+                    and is_covered(table, filters)):
+                continue
+            columns = filters + order
+        if columns and is_covered(table, columns):
+            continue
+        issues.append({
+            'kind': kind,
+            'table': table,
+            'columns': tuple(columns),
+        })
+    return issues
+
+
+def run(context, min_rows):
+    """{имя: [(SQL, [замечания]), ...]} и предлагаемые индексы."""
+    params = url_params(context)
+    user_client = APIClient()
+    user_client.force_authenticate(context['user'])
+    clients = {True: user_client, False: APIClient()}
+    rows = table_rows()
+    results = {}
+    proposals = defaultdict(set)
+    for name, url, auth in AUDITS:
+        statements = record_statements(clients[auth], url.format(**params))
+        results[name] = []
+        for sql, sql_params in statements:
+            issues = audit_statement(sql, sql_params, rows, min_rows)
+            results[name].append((sql, issues))
+            for issue in issues:
+                if issue['columns']:
+                    proposals[issue['table']].add(issue['columns'])
+    tables = models_by_table()
+    definitions = sorted(
+        index_definition(tables[table], columns)
+        for table, table_proposals in proposals.items()
+        for columns in table_proposals
+        # Индекс по началу столбцов другого предложения не нужен.
+        if not any(
+            other[:len(columns)] == columns and other != columns
+            for other in table_proposals
+        )
+    )
+    return results, definitions
@@ -0,0 +1,185 @@
+import json
+import time
+from pathlib import Path
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+BUDGETS_PATH = Path(__file__).resolve().parent / 'budgets.json'
+
+# (имя, URL, авторизация: True, False или 'token' — настоящим токеном)
+ENDPOINTS = (
+    ('recipes-list', '/api/recipes/', True),
+    ('recipes-list-anonymous', '/api/recipes/', False),
+    ('recipes-list-anonymous-tags',
+     '/api/recipes/?tags={tag}&tags={tag2}&page=2', False),
+    ('recipes-list-limit', '/api/recipes/?limit=100', True),
+    ('recipes-list-cursor', '/api/recipes/?cursor=&limit=100', True),
+    ('recipes-list-tags', '/api/recipes/?tags={tag}&tags={tag2}', True),
+    ('recipes-list-author', '/api/recipes/?author={author}', True),
+    ('recipes-list-favorited', '/api/recipes/?is_favorited=1', True),
+    ('recipes-list-in-cart', '/api/recipes/?is_in_shopping_cart=1', True),
+    ('recipes-list-popular',
+     '/api/recipes/?ordering=-favorites_count&limit=100', True),
+    ('recipes-search', '/api/recipes/?search={word}', True),
+    ('recipes-search-tags',
+     '/api/recipes/?search={word}&tags={tag}&limit=100', True),
+    ('recipes-detail', '/api/recipes/{recipe}/', True),
+    ('recipes-list-not-modified', '/api/recipes/?limit=100', True),
+    ('recipes-detail-not-modified', '/api/recipes/{recipe}/', True),
+    ('recipes-download-shopping-cart',
+     '/api/recipes/download_shopping_cart/', True),
+    ('recipes-download-shopping-cart-csv',
+     '/api/recipes/download_shopping_cart/?format=csv', True),
+    ('recipes-download-shopping-cart-pdf',
+     '/api/recipes/download_shopping_cart/?format=pdf', True),
+    ('recipes-feed', '/api/recipes/feed/?limit=100', True),
+    ('users-list', '/api/users/?limit=100', True),
+    ('users-list-cursor', '/api/users/?cursor=&limit=100', True),
+    ('users-detail', '/api/users/{author}/', True),
+    ('users-me', '/api/users/me/', True),
+    ('users-me-token', '/api/users/me/', 'token'),
+    ('users-subscriptions',
+     '/api/users/subscriptions/?limit=100&recipes_limit=3', True),
+    ('users-subscriptions-cursor',
+     '/api/users/subscriptions/?cursor=&limit=100&recipes_limit=3', True),
+    ('ingredients-list', '/api/ingredients/', False),
+    ('ingredients-search', '/api/ingredients/?name={ingredient}', False),
+    ('ingredients-detail', '/api/ingredients/{ingredient_id}/', False),
+    ('tags-list', '/api/tags/', False),
+    ('tags-detail', '/api/tags/{tag_id}/', False),
+)
+
+# Страницы админки: (имя, URL). Открываются от имени суперпользователя.
+ADMIN_PAGES = (
+    ('admin-recipes', '/admin/recipes/recipe/'),
+    ('admin-recipes-author',
+     '/admin/recipes/recipe/?author__username={author_username}'),
+    ('admin-recipes-search', '/admin/recipes/recipe/?q={word}'),
+    ('admin-recipe-change', '/admin/recipes/recipe/{recipe}/change/'),
+    ('admin-carts', '/admin/recipes/cart/'),
+    ('admin-carts-user', '/admin/recipes/cart/?user__username={username}'),
+    ('admin-favorites', '/admin/recipes/favoriterecipe/'),
+    ('admin-ingredients', '/admin/recipes/ingredient/'),
+    ('admin-recipe-ingredients', '/admin/recipes/recipeingredientamount/'),
+    ('admin-tags', '/admin/recipes/tag/'),
+    ('admin-users', '/admin/users/user/'),
+    ('admin-subscriptions', '/admin/users/subscription/'),
+)
+
+
+def url_params(context):
+    return {
+        'recipe': context['recipe'].pk,
+        'author': context['author'].pk,
+        'tag': context['tags'][0].slug,
+        'tag2': context['tags'][1].slug,
+        'tag_id': context['tags'][0].pk,
+        'ingredient': context['ingredient'].name[:3],
+        'word': context['recipe'].name.split()[0],
+        'ingredient_id': context['ingredient'].pk,
+        'author_username': context['author'].username,
+        'username': context['user'].username,
+    }
+
+
+def measure(client, url, repeat=3, headers=None):
+    """
+    Замеры лучшего по времени прогона.
+
+    Число запросов берётся максимальное: первый прогон идёт с холодными
+    кешами, и именно он показывает, сколько запросов стоит эндпоинт.
+    """
+    best = None
+    max_queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url, **(headers or {}))
+            if response.streaming:
+                b''.join(response.streaming_content)
+            wall_ms = (time.perf_counter() - started) * 1000
+        max_queries = max(max_queries, len(queries))
+        result = {
+            'status': response.status_code,
+            'sql_ms': sum(
+                float(query['time']) for query in queries.captured_queries
+            ) * 1000,
+            'wall_ms': wall_ms,
+        }
+        if best is None or result['wall_ms'] < best['wall_ms']:
+            best = result
+    best['queries'] = max_queries
+    return best
+
+
+def run(context, repeat=3):
+    """Прогоняет все эндпоинты на заполненной базе."""
+    params = url_params(context)
+    user_client = APIClient()
+    user_client.force_authenticate(context['user'])
+    token_client = APIClient()
+    token, _ = Token.objects.get_or_create(user=context['user'])
+    token_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    anonymous_client = APIClient()
+    clients = {True: user_client, False: anonymous_client,
+               'token': token_client}
+    results = {}
+    for name, url, auth in ENDPOINTS:
+        client = clients[auth]
+        url = url.format(**params)
+        headers = None
+        if name.endswith('-not-modified'):
+            headers = {'HTTP_IF_NONE_MATCH': client.get(url)['ETag']}
+        results[name] = measure(client, url, repeat, headers)
+    admin_client = Client()
+    admin_client.force_login(context['admin'])
+    for name, url in ADMIN_PAGES:
+        results[name] = measure(admin_client, url.format(**params), repeat)
+    return results
+
+
+def load_budgets():
+    if not BUDGETS_PATH.exists():
+        return {}
+    with open(BUDGETS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_budgets(budgets):
+    with open(BUDGETS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(budgets, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def make_budget(result, headroom):
+    return {
+        'queries': result['queries'],
+        'wall_ms': round(max(result['wall_ms'] * headroom, 50)),
+    }
+
+
+def check(results, budgets, check_timing=True):
+    """Список нарушений бюджета для одного размера данных."""
+    errors = []
+    for name, result in results.items():
+        if result['status'] >= 400:
+            errors.append(f'{name}: статус ответа {result["status"]}')
+        budget = budgets.get(name)
+        if budget is None:
+            errors.append(f'{name}: нет бюджета')
+            continue
+        if result['queries'] > budget['queries']:
+            errors.append(
+                f'{name}: {result["queries"]} запросов, '
+                f'бюджет {budget["queries"]}'
+            )
+        if check_timing and result['wall_ms'] > budget['wall_ms']:
+            errors.append(
+                f'{name}: {result["wall_ms"]:.1f} мс, '
+                f'бюджет {budget["wall_ms"]} мс'
+            )
+    return errors
@@ -0,0 +1,364 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.validators import slug_re
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.metrics import count_cache
+from foodgram.routers import primary_reads
+from recipes import catalogue
+from recipes.models import Cart, FavoriteRecipe, Tag
+from users.models import Subscription, User
+
+
+def not_modified(request, etag):
+    """Совпадает ли etag с одним из If-None-Match запроса."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any(
+        (tag[2:] if tag.startswith('W/') else tag) == bare for tag in etags
+    )
+
+
+def conditional_response(request, etag, data=None):
+    """304 для совпавшего If-None-Match, иначе 200 с данными."""
+    if not_modified(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+class LocalCache:
+    """Ограниченный LRU в памяти процесса для одной версии справочника."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = OrderedDict()
+
+    def get(self, version, key):
+        with self.lock:
+            if version != self.version:
+                return None
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def set(self, version, key, data):
+        with self.lock:
+            if version != self.version:
+                self.version = version
+                self.entries.clear()
+            self.entries[key] = data
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+class ExpiringLocalCache:
+    """Ограниченный LRU в памяти процесса, записи живут ttl секунд."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, data)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class CatalogueCacheMixin:
+    """
+    Кеширует ответы справочника в памяти процесса и в общем кеше.
+
+    Ключ и ETag содержат версию справочника, поэтому после её смены
+    старые записи просто перестают использоваться.
+    """
+    catalogue = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.local_cache = LocalCache(settings.CATALOGUE_LOCAL_CACHE_SIZE)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cache_params(self, request):
+        """
+        Параметры фильтров справочника; остальные параметры запроса на ответ
+        не влияют и новых записей кеша не создают.
+        """
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is None:
+            return {}
+        return {
+            name: request.query_params.getlist(name)
+            for name in sorted(filterset_class.base_filters)
+            if name in request.query_params
+        }
+
+    def cache_key(self, request, version, kwargs):
+        """
+        Ключ ответа: хеш параметров, поэтому длинные строки поиска с
+        пробелами допустимы и для memcached.
+        """
+        digest = hashlib.md5(json.dumps(
+            [request.build_absolute_uri('/'), self.action, kwargs,
+             self.cache_params(request)],
+            sort_keys=True,
+        ).encode('utf-8')).hexdigest()
+        return f'catalogue:{self.catalogue}:{version}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        version = catalogue.get_version(self.catalogue)
+        etag = 'W/' + quote_etag(f'{self.catalogue}-{version}')
+        if not_modified(request, etag):
+            return conditional_response(request, etag)
+        key = self.cache_key(request, version, kwargs)
+        data = self.local_cache.get(version, key)
+        if data is None:
+            data = cache.get(key)
+        count_cache(
+            f'catalogue_{self.catalogue}', 'miss' if data is None else 'hit'
+        )
+        if data is None:
+            with primary_reads():
+                response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = (
+                list(response.data) if isinstance(response.data, list)
+                else dict(response.data)
+            )
+            cache.set(key, data, settings.CATALOGUE_CACHE_TIMEOUT)
+        self.local_cache.set(version, key, data)
+        return conditional_response(request, etag, data)
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode('utf-8')
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+def catalogue_versions():
+    return tuple(
+        catalogue.get_version(name)
+        for name in (catalogue.TAGS, catalogue.INGREDIENTS, catalogue.USERS)
+    )
+
+
+def recipe_etag(request, recipe):
+    """Валидатор рецепта с учётом признаков текущего пользователя."""
+    return make_etag(
+        recipe.pk,
+        recipe.updated_at.isoformat(),
+        request.user.pk,
+        recipe.is_favorited,
+        recipe.is_in_shopping_cart,
+        recipe.is_author_subscribed,
+        *catalogue_versions(),
+    )
+
+
+def user_state(user):
+    """Сводка избранного, корзины и подписок пользователя одним запросом."""
+    if user.is_anonymous:
+        return ()
+    annotations = {}
+    for name, model, date_field in (
+        ('favorites', FavoriteRecipe, 'add_to_favorite_date'),
+        ('cart', Cart, 'add_to_shopping_cart_date'),
+        ('subscriptions', Subscription, 'subscription_date'),
+    ):
+        rows = model.objects.filter(user=OuterRef('pk')).order_by()
+        annotations[f'{name}_count'] = Subquery(
+            rows.values('user').annotate(value=Count('pk')).values('value')
+        )
+        annotations[f'{name}_last'] = Subquery(
+            rows.values('user').annotate(
+                value=Max(date_field)
+            ).values('value')
+        )
+    state = User.objects.filter(pk=user.pk).annotate(
+        **annotations
+    ).values_list(*annotations).first()
+    return (user.pk,) + tuple(state or ())
+
+
+def recipe_list_validators(request, queryset):
+    """ETag и Last-Modified страницы списка без сериализации рецептов."""
+    state = queryset.order_by().aggregate(
+        last_modified=Max('updated_at'),
+        count=Count('pk', distinct=True),
+        favorites=Sum('favorites_count'),
+        carts=Sum('carts_count'),
+    )
+    etag = make_etag(
+        request.get_full_path(),
+        state['last_modified'],
+        state['count'],
+        state['favorites'],
+        state['carts'],
+        *user_state(request.user),
+        *catalogue_versions(),
+    )
+    return etag, state['last_modified']
+
+
+def add_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+# Параметры анонимных страниц списка рецептов, которые попадают в кеш.
+RECIPE_PAGE_PARAMS = frozenset(('tags', 'author', 'page', 'limit'))
+RECIPE_PAGE_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+TAG_SLUG_LENGTH = Tag._meta.get_field('slug').max_length
+
+
+def recipe_page_params(request):
+    """Нормализованные параметры страницы или None, если её не кешируем."""
+    if not request.user.is_anonymous:
+        return None
+    if not set(request.query_params) <= RECIPE_PAGE_PARAMS:
+        return None
+    params = {'tags': sorted(set(request.query_params.getlist('tags')))}
+    # Теги попадают в ключи версий: строки, которые не могут быть slug,
+    # не кешируются (memcached не принимает в ключах пробелы).
+    if not all(
+        slug_re.match(slug) and len(slug) <= TAG_SLUG_LENGTH
+        for slug in params['tags']
+    ):
+        return None
+    for name in ('author', 'page', 'limit'):
+        value = request.query_params.get(name)
+        if not value:
+            continue
+        # author=01 и author=1 — одна страница; неразобранные значения
+        # не порождают новых ключей.
+        try:
+            params[name] = int(value)
+        except ValueError:
+            return None
+        if params[name] < 1:
+            return None
+    if params.get('page') == 1:
+        del params['page']
+    return params
+
+
+def recipe_page_key(request, params):
+    """
+    Ключ страницы с версиями её рецептов: страница автора зависит только
+    от его рецептов, страница с тегами — от рецептов с этими тегами.
+    """
+    if 'author' in params:
+        names = [catalogue.recipe_author(params['author'])]
+    elif params['tags']:
+        names = [catalogue.recipe_tag(slug) for slug in params['tags']]
+    else:
+        names = [catalogue.RECIPES]
+    versions = catalogue.get_versions([catalogue.INGREDIENTS, *names])
+    digest = hashlib.md5(json.dumps(
+        [request.build_absolute_uri('/'), params, versions],
+        sort_keys=True,
+    ).encode('utf-8')).hexdigest()
+    return f'recipes:page:{digest}'
+
+
+def compute_once(key, handler):
+    """
+    Вызывает handler, пока остальные процессы ждут его результата в кеше.
+
+    Возвращает (запись из кеша, None) или (None, ответ handler).
+    """
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + settings.RECIPE_PAGE_LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, settings.RECIPE_PAGE_LOCK_TIMEOUT):
+        time.sleep(settings.RECIPE_PAGE_LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry, None
+        if time.monotonic() > deadline:
+            return None, handler()
+    try:
+        with primary_reads():
+            response = handler()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, (
+                dict(response.data),
+                {header: response[header] for header in RECIPE_PAGE_HEADERS
+                 if response.has_header(header)},
+            ), settings.RECIPE_PAGE_CACHE_TIMEOUT)
+        return None, response
+    finally:
+        cache.delete(lock_key)
+
+
+def cached_recipe_page(request, params, handler):
+    """Анонимная страница списка рецептов из общего кеша."""
+    key = recipe_page_key(request, params)
+    entry = cache.get(key)
+    count_cache('recipe_page', 'hit' if entry is not None else 'miss')
+    if entry is None:
+        entry, response = compute_once(key, handler)
+        if response is not None:
+            return response
+    data, headers = entry
+    if not_modified(request, headers.get('ETag', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -1,7 +1,11 @@
-from django.db.models import Q
+from django.db.models import Case, IntegerField, When
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 
+from api.pagination import RecipeCursorPagination
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import ingredient_index, search_recipes
 
 
 def get_queryset_filter(queryset, user, value, relation):
@@ -19,9 +23,11 @@ class IngredientFilter(FilterSet):
         fields = ('name',)
 
     def ingredient_name_filter(self, queryset, name, value):
-        return queryset.filter(
-            Q(name__startswith=value) | Q(name__contains=value)
-        )
+        found = ingredient_index.search(value)
+        return queryset.filter(pk__in=found).order_by(Case(
+            *(When(pk=pk, then=rank) for rank, pk in enumerate(found)),
+            output_field=IntegerField(),
+        ))
 
     def filter(self, queryset, *args, **kwargs):
         return super().filter(queryset, *args, **kwargs)
@@ -38,6 +44,7 @@ class RecipeFilter(FilterSet):
         to_field_name='slug',
         queryset=Tag.objects.all(),
     )
+    search = filters.CharFilter(method='search_filter')
 
     class Meta:
         model = Recipe
@@ -51,6 +58,9 @@ class RecipeFilter(FilterSet):
             relation='favorites__user'
         )
 
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     def is_in_shopping_cart_filter(self, queryset, name, value):
         return get_queryset_filter(
             queryset=queryset,
@@ -58,3 +68,35 @@ class RecipeFilter(FilterSet):
             value=value,
             relation='shopping_cart__user'
         )
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """
+    ?ordering= по популярности; при равенстве — обычный порядок рецептов.
+    Без параметра порядок queryset не меняется, чтобы сохранить ранжирование
+    поиска. Вместе с ?cursor= не принимается: курсор хранит только значение
+    первого поля сортировки, и при неуникальном поле страницы теряли бы или
+    повторяли рецепты.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if (self.ordering_param in request.query_params
+                and RecipeCursorPagination.cursor_query_param
+                in request.query_params):
+            raise ValidationError({
+                self.ordering_param: 'Сортировка недоступна вместе с cursor.'
+            })
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return RecipeCursorPagination.ordering
+        return (*ordering, *(
+            field for field in RecipeCursorPagination.ordering
+            if field.lstrip('-') not in {
+                item.lstrip('-') for item in ordering
+            }
+        ))
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param not in request.query_params:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
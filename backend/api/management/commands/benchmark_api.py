@@ -0,0 +1,97 @@
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmarks import dataset, runner
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число SQL-запросов и время ответа эндпоинтов API '
+        'на синтетических данных и сверяет их с бюджетами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='small,medium',
+            help='Размеры данных через запятую: '
+                 + ', '.join(dataset.SIZES),
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--update-budgets',
+            action='store_true',
+            help='Записать результаты в budgets.json вместо проверки.',
+        )
+        parser.add_argument(
+            '--skip-timing',
+            action='store_true',
+            help='Проверять только число запросов.',
+        )
+        parser.add_argument(
+            '--headroom',
+            type=float,
+            default=3.0,
+            help='Запас по времени при обновлении бюджетов.',
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['sizes'].split(',')
+        unknown = set(sizes) - set(dataset.SIZES)
+        if unknown:
+            raise CommandError(f'Неизвестные размеры: {", ".join(unknown)}')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            results = {}
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                context = dataset.seed(size)
+                results[size] = runner.run(context, options['repeat'])
+                self.report(size, results[size])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        budgets = runner.load_budgets()
+        if options['update_budgets']:
+            for size, size_results in results.items():
+                budgets[size] = {
+                    name: runner.make_budget(result, options['headroom'])
+                    for name, result in size_results.items()
+                }
+            runner.save_budgets(budgets)
+            self.stdout.write(f'Бюджеты записаны в {runner.BUDGETS_PATH}')
+            return
+
+        errors = [
+            f'[{size}] {error}'
+            for size, size_results in results.items()
+            for error in runner.check(
+                size_results,
+                budgets.get(size, {}),
+                check_timing=not options['skip_timing'],
+            )
+        ]
+        if errors:
+            raise CommandError(
+                'Превышены бюджеты производительности:\n' + '\n'.join(errors)
+            )
+        self.stdout.write(self.style.SUCCESS('Все бюджеты соблюдены.'))
+
+    def report(self, size, results):
+        self.stdout.write(f'\nРазмер данных: {size}')
+        self.stdout.write(
+            f'{"эндпоинт":<34}{"код":>5}{"запросы":>9}'
+            f'{"SQL, мс":>10}{"всего, мс":>11}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<34}{result["status"]:>5}{result["queries"]:>9}'
+                f'{result["sql_ms"]:>10.1f}{result["wall_ms"]:>11.1f}'
+            )
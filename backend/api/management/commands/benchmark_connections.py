@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmarks import dataset
+from foodgram.backends.postgresql.base import close_pool
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает число запросов в секунду с новым соединением с базой '
+        'на каждый запрос, с постоянными соединениями и с пулом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/users/?limit=10')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--conn-max-age',
+            type=int,
+            default=60,
+            help='CONN_MAX_AGE для режима постоянных соединений.',
+        )
+
+    def modes(self, options):
+        yield 'соединение на запрос (CONN_MAX_AGE=0)', 0, 0
+        yield (f'постоянные соединения (CONN_MAX_AGE='
+               f'{options["conn_max_age"]})'), options['conn_max_age'], 0
+        if connection.vendor == 'postgresql':
+            yield (f'пул в процессе (DB_POOL_SIZE={options["threads"]})', 0,
+                   options['threads'])
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            print('Внимание: тестовая база SQLite живёт в памяти и не '
+                  'переоткрывается, сравнение показательно для PostgreSQL.')
+        settings_dict = dict(connection.settings_dict)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            dataset.seed('small')
+            for title, conn_max_age, pool_size in self.modes(options):
+                rps = self.measure(
+                    options['url'], options['requests'], options['threads'],
+                    conn_max_age, pool_size,
+                )
+                print(f'{title:<45} {rps:8.1f} запросов/с')
+        finally:
+            close_pool(connection.alias)
+            connections.close_all()
+            connection.settings_dict.update(
+                CONN_MAX_AGE=settings_dict['CONN_MAX_AGE'],
+                POOL_SIZE=settings_dict.get('POOL_SIZE', 0),
+            )
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def measure(self, url, total, threads, conn_max_age, pool_size):
+        """Запросов в секунду при заданных CONN_MAX_AGE и размере пула."""
+        connections.close_all()
+        close_pool(connection.alias)
+        # settings_dict общий для соединений всех потоков.
+        connection.settings_dict.update(
+            CONN_MAX_AGE=conn_max_age, POOL_SIZE=pool_size
+        )
+
+        def worker(count):
+            client = Client()
+            try:
+                for _ in range(count):
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f'{url}: статус ответа {response.status_code}'
+                        )
+            finally:
+                connections.close_all()
+
+        counts = [total // threads + (number < total % threads)
+                  for number in range(threads)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(worker, counts))
+        return total / (time.perf_counter() - started)
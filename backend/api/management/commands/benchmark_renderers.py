@@ -0,0 +1,108 @@
+import io
+import timeit
+
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarks import dataset
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+RENDERERS = (JSONRenderer, ORJSONRenderer)
+PARSERS = (JSONParser, ORJSONParser)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость JSON-рендереров и парсеров на странице '
+        'RecipeReadSerializer из синтетических данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            default='medium',
+            choices=dataset.SIZES,
+            help='Размер синтетических данных.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Рецептов на странице.',
+        )
+        parser.add_argument('--number', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            call_command('flush', interactive=False, verbosity=0)
+            context = dataset.seed(options['size'])
+            page = self.recipe_page(context['user'], options['limit'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        contents = {
+            renderer: renderer().render(page) for renderer in RENDERERS
+        }
+        parsed = [
+            JSONParser().parse(io.BytesIO(content))
+            for content in contents.values()
+        ]
+        if any(data != parsed[0] for data in parsed):
+            raise CommandError('Рендереры вернули разные данные.')
+
+        self.stdout.write(
+            f'{len(page["results"])} рецептов, '
+            f'{len(contents[JSONRenderer])} байт'
+        )
+        self.report('Рендеринг', [
+            (renderer.__name__, lambda renderer=renderer:
+                renderer().render(page))
+            for renderer in RENDERERS
+        ], options)
+        content = contents[JSONRenderer]
+        self.report('Разбор', [
+            (parser.__name__, lambda parser=parser:
+                parser().parse(io.BytesIO(content)))
+            for parser in PARSERS
+        ], options)
+
+    def recipe_page(self, user, limit):
+        """Страница списка рецептов в том виде, в каком её отдаёт API."""
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        recipes = Recipe.objects.with_user_flags(user).with_related()[:limit]
+        return {
+            'count': Recipe.objects.count(),
+            'next': 'http://testserver/api/recipes/?page=2',
+            'previous': None,
+            'results': RecipeReadSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+        }
+
+    def report(self, title, candidates, options):
+        self.stdout.write(f'{title}:')
+        baseline = None
+        for name, func in candidates:
+            best = min(timeit.repeat(
+                func, number=options['number'], repeat=options['repeat']
+            )) / options['number'] * 1000
+            baseline = baseline or best
+            self.stdout.write(
+                f'  {name:<16} {best:>8.3f} мс  x{baseline / best:.1f}'
+            )
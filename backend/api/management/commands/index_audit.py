@@ -0,0 +1,81 @@
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmarks import dataset, indexes
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов фильтров рецептов и ингредиентов, '
+        'списка покупок и подписок на синтетических данных, отмечает '
+        'последовательные чтения и сортировки и предлагает индексы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            default='large',
+            choices=dataset.SIZES,
+            help='Размер синтетических данных.',
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=1000,
+            help='Не отмечать чтения и сортировки меньшего числа строк.',
+        )
+        parser.add_argument(
+            '--sql',
+            action='store_true',
+            help='Печатать SQL запросов с замечаниями.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Завершиться с ошибкой, если предложены индексы.',
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            call_command('flush', interactive=False, verbosity=0)
+            context = dataset.seed(options['size'])
+            results, definitions = indexes.run(context, options['min_rows'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, statements in results.items():
+            issues = sum(len(statement_issues)
+                         for _, statement_issues in statements)
+            self.stdout.write(
+                f'{name:<34} {len(statements):>3} запросов, '
+                f'замечаний: {issues}'
+            )
+            for sql, statement_issues in statements:
+                for issue in statement_issues:
+                    self.stdout.write(self.describe(issue))
+                if statement_issues and options['sql']:
+                    self.stdout.write(f'      {sql}')
+
+        if not definitions:
+            self.stdout.write(self.style.SUCCESS('Недостающих индексов нет.'))
+            return
+        self.stdout.write('Предлагаемые индексы:')
+        for definition in definitions:
+            self.stdout.write(f'  {definition}')
+        if options['check']:
+            raise CommandError('Есть запросы без подходящих индексов.')
+
+    def describe(self, issue):
+        kind = (
+            'последовательное чтение' if issue['kind'] == 'seq_scan'
+            else 'сортировка'
+        )
+        columns = ', '.join(issue['columns']) or 'нет условий'
+        return f'    {kind} {issue["table"]} ({columns})'
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connections
+
+from foodgram.routers import measure_lag
+
+
+class Command(BaseCommand):
+    help = 'Показывает отставание реплик для чтения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            type=float,
+            metavar='SECONDS',
+            help='Повторять замер с заданным интервалом.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            print('Реплики не настроены (DB_REPLICAS).')
+            return
+        while True:
+            self.report()
+            if not options['watch']:
+                return
+            time.sleep(options['watch'])
+
+    def report(self):
+        for alias in settings.DATABASE_REPLICAS:
+            database = connections[alias].settings_dict
+            location = database['HOST'] or database['NAME']
+            lag = measure_lag(alias)
+            if lag is None:
+                state = 'недоступна'
+            elif lag > settings.REPLICA_MAX_LAG:
+                state = f'отставание {lag:.1f} с, выше REPLICA_MAX_LAG'
+            else:
+                state = f'отставание {lag:.1f} с'
+            print(f'{alias} ({location}): {state}')
@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.routers import choose_replica, is_sticky, replica_reads
+
+
+class ReplicaReadMixin:
+    """
+    Безопасные запросы читают с одной реплики, если пользователь ничего не
+    менял последние REPLICA_STICKY_SECONDS. replica_actions ограничивает
+    действия.
+    """
+    replica_actions = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (settings.DATABASE_REPLICAS
+                and request.method in SAFE_METHODS
+                and (self.replica_actions is None
+                     or self.action in self.replica_actions)
+                and not is_sticky(request.user)):
+            self.replica_reads_token = replica_reads.set(choose_replica())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, 'replica_reads_token', None)
+        if token is not None:
+            replica_reads.reset(token)
+            self.replica_reads_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,4 +1,11 @@
+from base64 import b64decode, b64encode
+from binascii import Error as Base64Error
+from datetime import datetime
+
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(pagination.PageNumberPagination):
@@ -13,3 +20,107 @@ class CartPagination(pagination.LimitOffsetPagination):
     page_query_param = 'page'
     page_size_query_param = 'limit'
     max_limit = 1000
+
+
+class RecipeCursorPagination(pagination.CursorPagination):
+    """Keyset-пагинация в порядке Recipe.Meta.ordering."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-pub_date', 'name', 'id')
+
+
+class UserCursorPagination(RecipeCursorPagination):
+    ordering = ('username',)
+
+
+class CursorSwitchPagination(CustomPagination):
+    """Постраничная пагинация, keyset-режим включается параметром ?cursor=."""
+    cursor_pagination_class = None
+
+    def __init__(self):
+        self.cursor_paginator = self.cursor_pagination_class()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = (
+            self.cursor_paginator.cursor_query_param in request.query_params
+        )
+        if self.cursor_mode:
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(CursorSwitchPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class UserPagination(CursorSwitchPagination):
+    cursor_pagination_class = UserCursorPagination
+
+
+class FeedPagination(pagination.BasePagination):
+    """
+    Keyset-пагинация ленты: курсор — позиция (pub_date, id рецепта)
+    последней записи страницы, страницы читаются только вперёд.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_positions(self, request, fetch):
+        """
+        fetch(after, size) возвращает позиции ленты после курсора; отдаёт
+        позиции текущей страницы.
+        """
+        self.base_url = request.build_absolute_uri()
+        size = self.get_page_size(request)
+        positions = fetch(self.decode_cursor(request), size + 1)
+        self.next_position = (
+            positions[size - 1] if len(positions) > size else None
+        )
+        return positions[:size]
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_page_size(self, request):
+        try:
+            return pagination._positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, recipe_id = b64decode(
+                encoded.encode('ascii')
+            ).decode('ascii').split('|')
+            return datetime.fromisoformat(pub_date), int(recipe_id)
+        except (Base64Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        pub_date, recipe_id = self.next_position
+        encoded = b64encode(
+            f'{pub_date.isoformat()}|{recipe_id}'.encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
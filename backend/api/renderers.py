@@ -0,0 +1,195 @@
+import abc
+import csv
+import io
+from decimal import Decimal
+
+import orjson
+from django.conf import settings
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+CHUNK_SIZE = 8192
+
+# Даты и время orjson пишет сам, UTC — с суффиксом Z, как JSONEncoder DRF.
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+# U+2028 и U+2029 экранируются, чтобы ответ оставался корректным JavaScript.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+drf_encoder = JSONEncoder()
+
+
+def orjson_default(obj):
+    """Типы, неизвестные orjson, — так же, как в JSONEncoder DRF."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return drf_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Ответ с отступами (browsable API,
+    Accept: application/json; indent=4) отдаётся штатным рендерером.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data, default=orjson_default, option=ORJSON_OPTIONS
+        )
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
+
+
+def buffered(chunks, size=CHUNK_SIZE):
+    """Склеивает мелкие строки в куски порядка size байт."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        chunk = chunk.encode('utf-8')
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+class ShoppingListRenderer(BaseRenderer, abc.ABC):
+    """
+    Базовый класс потоковой выгрузки списка покупок; формат задают
+    подклассы через lines.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ORJSONRenderer().render(
+            data, renderer_context=renderer_context
+        )
+
+    def stream(self, user, ingredients):
+        return buffered(self.lines(user, ingredients))
+
+    @abc.abstractmethod
+    def lines(self, user, ingredients):
+        """Части выгрузки по порядку."""
+
+    def header(self, user):
+        return (
+            f'Привет, {user.first_name}!\n\n'
+            'Вот твой список покупок на сегодня.\n\n'
+            'Нужно купить:\n\n'
+        )
+
+    def ingredient_line(self, ingredient):
+        return (
+            f' - {ingredient["ingredient__name"]} '
+            f'({ingredient["ingredient__measurement_unit"]})'
+            f' - {ingredient["in_shopping_cart_ingredient_amount"]}'
+        )
+
+    footer = 'Foodgram.'
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def lines(self, user, ingredients):
+        yield self.header(user)
+        separator = ''
+        for ingredient in ingredients:
+            yield separator + self.ingredient_line(ingredient)
+            separator = '\n'
+        yield '\n\n' + self.footer
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def lines(self, user, ingredients):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+        for ingredient in ingredients:
+            writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['in_shopping_cart_ingredient_amount'],
+            ))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+    line_height = 18
+
+    def stream(self, user, ingredients):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT)
+            )
+        buffer = io.BytesIO()
+        document = canvas.Canvas(buffer, pagesize=A4)
+        document.setTitle('Foodgram')
+        self.text = None
+        for line in self.lines(user, ingredients):
+            self.draw_line(document, line)
+        self.finish_page(document)
+        document.save()
+        buffer.seek(0)
+        return iter(lambda: buffer.read(CHUNK_SIZE), b'')
+
+    def lines(self, user, ingredients):
+        yield from self.header(user).split('\n')[:-1]
+        for ingredient in ingredients:
+            yield self.ingredient_line(ingredient)
+        yield ''
+        yield self.footer
+
+    def draw_line(self, document, line):
+        if self.text is not None and self.text.getY() < self.margin:
+            self.finish_page(document)
+            document.showPage()
+        if self.text is None:
+            self.text = document.beginText(self.margin, A4[1] - self.margin)
+            self.text.setFont(
+                self.font_name, self.font_size, leading=self.line_height
+            )
+        self.text.textLine(line)
+
+    def finish_page(self, document):
+        if self.text is not None:
+            document.drawText(self.text)
+            self.text = None
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListPDFRenderer,
+)
@@ -1,4 +1,4 @@
-from django.db.models import F
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework.exceptions import ValidationError
@@ -11,11 +11,39 @@ from api.constants import (LENGTH_MIN_MEANING,
                            LENGTH_MAX_MEANING,
                            LENGTH_MAX_VALUE,
                            )
+from foodgram.instrumentation import measure
+from recipes import shopping_list
+from recipes.images import rendition_urls
 from recipes.models import Ingredient, Recipe, RecipeIngredientAmount, Tag
 from users.models import User
 
 
-class DjoserUserCreateSerializer(UserCreateSerializer):
+def get_recipes_limit(request):
+    """Положительный ?recipes_limit= или None, если ограничения нет."""
+    try:
+        recipes_limit = int(request.GET.get('recipes_limit'))
+    except (ValueError, TypeError):
+        return None
+    return recipes_limit if recipes_limit > 0 else None
+
+
+class TimedSerializerMixin:
+    """Время сериализации попадает в замеры запроса."""
+
+    def to_representation(self, instance):
+        with measure('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedBase64ImageField(Base64ImageField):
+    """Время декодирования картинки попадает в замеры запроса."""
+
+    def to_internal_value(self, data):
+        with measure('decode'):
+            return super().to_internal_value(data)
+
+
+class DjoserUserCreateSerializer(TimedSerializerMixin, UserCreateSerializer):
 
     class Meta:
         model = User
@@ -29,7 +57,7 @@ class DjoserUserCreateSerializer(UserCreateSerializer):
         )
 
 
-class DjoserUserSerializer(UserSerializer):
+class DjoserUserSerializer(TimedSerializerMixin, UserSerializer):
 
     is_subscribed = SerializerMethodField()
 
@@ -40,9 +68,13 @@ class DjoserUserSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return bool(request and request.user.is_authenticated
-                    and obj.subscriber_user.filter(user=request.user).exists())
+                    and obj.author_in_subscription.filter(
+                        user=request.user
+                    ).exists())
 
 
 class SubscriptionSerializer(DjoserUserSerializer):
@@ -71,18 +103,14 @@ class SubscriptionSerializer(DjoserUserSerializer):
         )
 
     def get_recipes_count(self, obj):
-        return obj.recipe_author.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        recipes_limit = self.context['request'].GET.get('recipes_limit')
-
-        try:
-            recipes_limit_int = int(recipes_limit) if recipes_limit else None
-        except (ValueError, TypeError):
-            recipes_limit_int = None
-
-        recipes = obj.recipe_author.all()[:recipes_limit_int] \
-            if recipes_limit_int else obj.recipe_author.all()
+        if hasattr(obj, 'recipe_previews'):
+            recipes = obj.recipe_previews
+        else:
+            recipes_limit = get_recipes_limit(self.context['request'])
+            recipes = obj.recipe_author.all()[:recipes_limit]
         return RecipeShortSerializer(recipes, many=True, read_only=True).data
 
     def validate(self, data):
@@ -101,9 +129,10 @@ class SubscriptionSerializer(DjoserUserSerializer):
         return data
 
 
-class RecipeShortSerializer(ModelSerializer):
+class RecipeShortSerializer(TimedSerializerMixin, ModelSerializer):
 
-    image = Base64ImageField()
+    image = TimedBase64ImageField()
+    image_renditions = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -111,6 +140,7 @@ class RecipeShortSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'image_renditions',
             'cooking_time',
         )
         read_only_fields = (
@@ -120,19 +150,22 @@ class RecipeShortSerializer(ModelSerializer):
             'cooking_time',
         )
 
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj, self.context.get('request'))
 
-class TagSerializer(ModelSerializer):
+
+class TagSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug',)
-        read_only_fields = '__all__'
+        read_only_fields = fields
 
 
-class IngredientSerializer(ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit',)
-        read_only_fields = '__all__'
+        read_only_fields = fields
 
 
 class RecipeIngredientAmountSerializer(ModelSerializer):
@@ -150,13 +183,14 @@ class RecipeIngredientAmountSerializer(ModelSerializer):
         )
 
 
-class RecipeReadSerializer(ModelSerializer):
+class RecipeReadSerializer(TimedSerializerMixin, ModelSerializer):
 
     author = DjoserUserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     ingredients = SerializerMethodField()
+    image_renditions = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -169,11 +203,19 @@ class RecipeReadSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_renditions',
             'text',
             'cooking_time',
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_author_subscribed'):
+            instance.author.is_subscribed = instance.is_author_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user and not user.is_anonymous:
             related_manager = getattr(user, 'favorites')
@@ -181,31 +223,37 @@ class RecipeReadSerializer(ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if not user.is_anonymous:
             related_manager = getattr(user, 'shopping_cart')
             return related_manager.filter(recipe=obj).exists()
         return False
 
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj, self.context.get('request'))
+
     def get_ingredients(self, obj):
-        return (
-            obj.ingredients.values(
-                'id',
-                'name',
-                'measurement_unit',
-                amount=F('recipeingredientamount__amount')
-            )
-        )
+        return [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in obj.recipeingredientamount_set.all()
+        ]
 
 
-class WriteRecipeSerializer(ModelSerializer):
+class WriteRecipeSerializer(TimedSerializerMixin, ModelSerializer):
 
     ingredients = RecipeIngredientAmountSerializer(many=True)
     tags = PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
     )
-    image = Base64ImageField()
+    image = TimedBase64ImageField()
     author = DjoserUserSerializer(read_only=True)
     cooking_time = IntegerField(
         min_value=LENGTH_MIN_MEANING,
@@ -251,63 +299,81 @@ class WriteRecipeSerializer(ModelSerializer):
             raise ValidationError(
                 'Ингредиенты должны быть уникальны.'
             )
+        missing = unique_ingredient_id_list - set(
+            Ingredient.objects.filter(
+                id__in=unique_ingredient_id_list
+            ).values_list('id', flat=True)
+        )
+        if missing:
+            raise ValidationError(
+                {'ingredients': 'Ингредиенты с id '
+                 f'{", ".join(map(str, sorted(missing)))} не существуют.'}
+            )
         return obj
 
+    def save_ingredients(self, recipe, ingredients):
+        """Записывает разницу между старым и новым составом рецепта."""
+        new_amounts = {item['id']: item['amount'] for item in ingredients}
+        rows = {
+            row.ingredient_id: row
+            for row in RecipeIngredientAmount.objects.filter(recipe=recipe)
+        }
+        old_amounts = {
+            ingredient_id: row.amount for ingredient_id, row in rows.items()
+        }
+        RecipeIngredientAmount.objects.bulk_create(
+            RecipeIngredientAmount(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in rows
+        )
+        changed = []
+        for ingredient_id, row in rows.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredientAmount.objects.bulk_update(changed, ['amount'])
+        removed = rows.keys() - new_amounts.keys()
+        if removed:
+            RecipeIngredientAmount.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        return old_amounts, new_amounts
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
 
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
-
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            amount = ingredient['amount']
-
-            try:
-                ingredient_obj = Ingredient.objects.get(id=ingredient_id)
-            except Ingredient.DoesNotExist:
-                raise ValidationError(
-                    {'ingredients': f'Ингредиент с id {ingredient_id}'
-                     'не существует.'}
-                )
-
-            RecipeIngredientAmount.objects.create(
-                recipe=recipe,
-                ingredient=ingredient_obj,
-                amount=amount
-            )
-
+        self.save_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'tags' in validated_data:
-            instance.tags.clear()
             instance.tags.set(validated_data.pop('tags'))
         if 'ingredients' in validated_data:
-            RecipeIngredientAmount.objects.filter(recipe=instance).delete()
-            ingredients = validated_data.pop('ingredients')
-            for ingredient in ingredients:
-                ingredient_id = ingredient['id']
-                amount = ingredient['amount']
-
-            try:
-                ingredient_obj = Ingredient.objects.get(id=ingredient_id)
-            except Ingredient.DoesNotExist:
-                raise ValidationError(
-                    {'ingredients': f'Ингредиент с id {ingredient_id}'
-                     'не существует.'}
-                )
-            RecipeIngredientAmount.objects.create(
-                recipe=instance,
-                ingredient=ingredient_obj,
-                amount=amount
+            shopping_list.update_recipe(
+                instance.pk,
+                *self.save_ingredients(
+                    instance, validated_data.pop('ingredients')
+                ),
             )
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context['request']
         context = {'request': request}
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         return RecipeReadSerializer(
             instance=instance,
             context=context,
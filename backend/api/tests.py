@@ -0,0 +1,148 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.worker import execute
+from recipes import counters, feed, shopping_list
+from recipes.models import (Cart, CartIngredient, FeedEntry, Ingredient,
+                            Recipe, RecipeIngredientAmount, Tag)
+from users.models import Subscription, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode('ascii')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_EAGER=False)
+class DenormalizedDataTest(TestCase):
+    """
+    Списки покупок, ленты и счётчики ведутся по шагам из сигналов,
+    сериализаторов и удаления рецепта; после типичных действий они должны
+    совпадать с пересчётом с нуля.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.users = [
+            User.objects.create(
+                username=f'user{number}',
+                email=f'user{number}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+            )
+            for number in range(3)
+        ]
+        self.clients = []
+        for user in self.users:
+            client = APIClient()
+            client.force_authenticate(user)
+            self.clients.append(client)
+        self.tag = Tag.objects.create(name='Обед', color='#00FF00',
+                                      slug='lunch')
+        self.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(4)
+        ]
+
+    def recipe_payload(self, amounts):
+        return {
+            'name': 'Суп',
+            'text': 'Сварить.',
+            'cooking_time': 10,
+            'tags': [self.tag.pk],
+            'image': image_data(),
+            'ingredients': [
+                {'id': self.ingredients[index].pk, 'amount': amount}
+                for index, amount in amounts.items()
+            ],
+        }
+
+    def create_recipe(self, author, amounts):
+        response = self.clients[author].post(
+            '/api/recipes/', self.recipe_payload(amounts), format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def run_feed_jobs(self):
+        for job in Job.objects.filter(queue='feed', status=Job.QUEUED):
+            execute(job)
+
+    def assert_matches_rebuild(self):
+        self.run_feed_jobs()
+        carts = set(CartIngredient.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ))
+        feeds = set(FeedEntry.objects.values_list(
+            'user_id', 'recipe_id', 'author_id', 'pub_date'
+        ))
+        shopping_list.rebuild()
+        feed.rebuild()
+        self.assertEqual(carts, set(CartIngredient.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        )))
+        self.assertEqual(feeds, set(FeedEntry.objects.values_list(
+            'user_id', 'recipe_id', 'author_id', 'pub_date'
+        )))
+        self.assertEqual(set(counters.reconcile().values()), {0})
+
+    def test_aggregates_match_rebuild(self):
+        reader, author, other = self.clients
+        author_id = self.users[1].pk
+        reader.post(f'/api/users/{author_id}/subscribe/')
+        other.post(f'/api/users/{author_id}/subscribe/')
+        soup = self.create_recipe(1, {0: 100, 1: 50})
+        salad = self.create_recipe(1, {1: 20, 2: 30})
+        own = self.create_recipe(2, {0: 10, 3: 5})
+        self.assert_matches_rebuild()
+
+        for client in (reader, other):
+            for recipe_id in (soup, salad):
+                client.post(f'/api/recipes/{recipe_id}/shopping_cart/')
+        reader.post(f'/api/recipes/{own}/shopping_cart/')
+        reader.post(f'/api/recipes/{soup}/favorite/')
+        self.assert_matches_rebuild()
+
+        other.delete(f'/api/recipes/{salad}/shopping_cart/')
+        self.assert_matches_rebuild()
+
+        response = author.patch(
+            f'/api/recipes/{soup}/',
+            self.recipe_payload({0: 150, 2: 40, 3: 1}),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assert_matches_rebuild()
+
+        self.assertEqual(author.delete(f'/api/recipes/{salad}/').status_code,
+                         204)
+        self.assertFalse(Recipe.objects.filter(pk=salad).exists())
+        self.assert_matches_rebuild()
+
+        other.delete(f'/api/users/{author_id}/subscribe/')
+        self.assert_matches_rebuild()
+
+        self.users[2].delete()
+        self.assertFalse(Cart.objects.filter(recipe_id=own).exists())
+        self.assertFalse(
+            RecipeIngredientAmount.objects.filter(recipe_id=own).exists()
+        )
+        self.assertTrue(Subscription.objects.exists())
+        self.assert_matches_rebuild()
@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (DjoserUserViewSet, IngredientViewSet, RecipeViewSet,
-                       TagViewSet)
+                       StatsView, TagViewSet)
 
 app_name = 'api'
 
@@ -13,6 +13,7 @@ router_v1.register('tags', TagViewSet, 'tags')
 router_v1.register('users', DjoserUserViewSet, 'users')
 
 urlpatterns = [
+    path('_stats/', StatsView.as_view(), name='stats'),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
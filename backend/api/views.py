@@ -1,23 +1,36 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils import timezone as tz
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from djoser.views import UserViewSet
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, SAFE_METHODS, IsAuthenticated
+from rest_framework.permissions import (AllowAny, SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from recipes.models import (Cart, FavoriteRecipe, Ingredient, Recipe,
-                            RecipeIngredientAmount, Tag)
+from foodgram import instrumentation, routers
+from recipes import catalogue, feed, shopping_list
+from recipes.models import (Cart, CartIngredient, FavoriteRecipe,
+                            Ingredient, Recipe, Tag, prefetch_recipe_previews,
+                            recipe_prefetches)
 from users.models import Subscription, User
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import CartPagination, CustomPagination
+from api import authentication
+from api.cache import (CatalogueCacheMixin, add_validators,
+                       cached_recipe_page, not_modified, recipe_etag,
+                       recipe_list_validators, recipe_page_params)
+from api.filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from api.mixins import ReplicaReadMixin
+from api.pagination import (CartPagination, FeedPagination,
+                            RecipePagination, UserPagination)
 from api.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
+from api.renderers import SHOPPING_LIST_RENDERERS
 from api.serializers import (DjoserUserSerializer,
                              DjoserUserCreateSerializer,
                              IngredientSerializer,
@@ -25,19 +38,33 @@ from api.serializers import (DjoserUserSerializer,
                              RecipeShortSerializer,
                              SubscriptionSerializer,
                              TagSerializer,
-                             WriteRecipeSerializer
+                             WriteRecipeSerializer,
+                             get_recipes_limit,
                              )
 
 
-class DjoserUserViewSet(UserViewSet):
+class DjoserUserViewSet(ReplicaReadMixin, UserViewSet):
 
     queryset = User.objects.all()
-    pagination_class = CustomPagination
+    pagination_class = UserPagination
+    replica_actions = ('list', 'retrieve', 'subscriptions')
     permission_classes = (AllowAny,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset().with_subscription_flag(
+            self.request.user
+        )
+        if self.action == 'subscriptions':
+            return queryset.filter(
+                author_in_subscription__user=self.request.user
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return DjoserUserSerializer
+        elif self.action in ('subscribe', 'subscriptions'):
+            return SubscriptionSerializer
         elif self.action == 'set_password':
             return SetPasswordSerializer
         return DjoserUserCreateSerializer
@@ -81,22 +108,19 @@ class DjoserUserViewSet(UserViewSet):
             methods=['get'],
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        user = request.user
-        subscriptions = User.objects.filter(author_in_subscription__user=user)
-        serializer_context = {"request": request}
-        paginated_subscriptions = self.paginate_queryset(subscriptions)
-
-        serializer = SubscriptionSerializer(
-            paginated_subscriptions,
-            many=True,
-            context=serializer_context)
+        authors = self.paginate_queryset(self.get_queryset())
+        prefetch_recipe_previews(authors, get_recipes_limit(request))
+        serializer = self.get_serializer(authors, many=True)
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(mixins.ListModelMixin,
+class IngredientViewSet(ReplicaReadMixin,
+                        CatalogueCacheMixin,
+                        mixins.ListModelMixin,
                         mixins.RetrieveModelMixin,
                         viewsets.GenericViewSet):
 
+    catalogue = catalogue.INGREDIENTS
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
@@ -104,26 +128,77 @@ class IngredientViewSet(mixins.ListModelMixin,
     filterset_class = IngredientFilter
 
 
-class TagViewSet(mixins.ListModelMixin,
+class TagViewSet(ReplicaReadMixin,
+                 CatalogueCacheMixin,
+                 mixins.ListModelMixin,
                  mixins.RetrieveModelMixin,
                  viewsets.GenericViewSet):
 
+    catalogue = catalogue.TAGS
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ModelViewSet):
 
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly | IsAdminOrReadOnly,)
-    pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = RecipePagination
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('favorites_count', 'carts_count', 'pub_date', 'name')
+    replica_actions = ('list', 'retrieve', 'feed')
+
+    def get_queryset(self):
+        queryset = Recipe.objects.with_user_flags(self.request.user)
+        if self.action == 'retrieve':
+            return queryset.select_related('author')
+        return queryset.with_related()
+
+    def list(self, request, *args, **kwargs):
+        params = recipe_page_params(request)
+        if params is None:
+            return self.uncached_list(request, *args, **kwargs)
+        return cached_recipe_page(
+            request,
+            params,
+            lambda: self.uncached_list(request, *args, **kwargs),
+        )
+
+    def uncached_list(self, request, *args, **kwargs):
+        etag, last_modified = recipe_list_validators(
+            request, self.filter_queryset(Recipe.objects.all())
+        )
+        if not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        return add_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        etag = recipe_etag(request, recipe)
+        if not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            prefetch_related_objects([recipe], *recipe_prefetches())
+            response = Response(self.get_serializer(recipe).data)
+        return add_validators(response, etag, recipe.updated_at)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Каскадное удаление и вычитание из списков покупок остаются в запросе:
+        список покупок не должен расходиться с корзинами даже на время
+        очереди. В очередь уходят только копии картинок и разнос по лентам.
+        """
+        with shopping_list.removing_recipe(instance.pk):
+            instance.delete()
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
@@ -182,10 +257,11 @@ class RecipeViewSet(ModelViewSet):
                     {"errors": "Вы уже добавили этот рецепт!"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            Cart.objects.create(
-                user=self.request.user,
-                recipe=recipe
-            )
+            with transaction.atomic():
+                Cart.objects.create(
+                    user=self.request.user,
+                    recipe=recipe
+                )
             serializer = RecipeShortSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -194,7 +270,8 @@ class RecipeViewSet(ModelViewSet):
             recipe__id=pk
         )
         if del_cart.exists():
-            del_cart.delete()
+            with transaction.atomic():
+                del_cart.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(
@@ -202,41 +279,63 @@ class RecipeViewSet(ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    def cart_text(self, user, ingredients, date):
-        text = (
-            f'Привет, {user.first_name}!\n\n'
-            'Вот твой список покупок на сегодня.\n\n'
-            'Нужно купить:\n\n'
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        """Рецепты авторов из подписок, от новых к старым."""
+        positions = self.paginator.paginate_positions(
+            request,
+            lambda after, size: feed.page(request.user, after, size),
         )
-        text += '\n'.join([
-            f' - {ingredient["ingredient__name"]} '
-            f'({ingredient["ingredient__measurement_unit"]})'
-            f' - {ingredient["in_shopping_cart_ingredient_amount"]}'
-            for ingredient in ingredients
-        ])
-        text += '\n\nFoodgram.'
-        return text
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in positions]
+        )
+        page = [
+            recipes[recipe_id] for _, recipe_id in positions
+            if recipe_id in recipes
+        ]
+        serializer = self.get_serializer(page, many=True)
+        return self.paginator.get_paginated_response(serializer.data)
 
     @action(detail=False,
             methods=['get'],
-            permission_classes=[IsAuthenticated])
+            permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request):
-        self.pagination_class = CartPagination
-        ingredients = RecipeIngredientAmount.objects.filter(
-            recipe__shopping_cart__user=self.request.user
+        """Список покупок в формате ?format=txt|csv|pdf"""
+        ingredients = CartIngredient.objects.filter(
+            user=self.request.user
         ).values(
             'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(
-            in_shopping_cart_ingredient_amount=Sum('amount')
-        ).order_by('ingredient__name')
-        shopping_list_date = tz.now()
-        cart_text = self.cart_text(
-            self.request.user, ingredients, shopping_list_date
+            'ingredient__measurement_unit',
+            in_shopping_cart_ingredient_amount=F('amount'),
+        ).order_by('ingredient__name').iterator(chunk_size=500)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(self.request.user, ingredients),
+            content_type=renderer.media_type,
         )
-
-        response = HttpResponse(cart_text, content_type='text/plain')
         response['Content-Disposition'] = (
-            'attachment; filename="Foodgram_shopping_cart.txt"'
+            'attachment; '
+            f'filename="Foodgram_shopping_cart.{renderer.format}"'
         )
         return response
+
+
+class StatsView(APIView):
+    """
+    Сводка обрабатывающего запрос процесса: перцентили замеров по
+    эндпоинтам, кеш токенов и отставание реплик.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            'endpoints': instrumentation.stats.summary(),
+            'sample_rate': settings.INSTRUMENTATION_SAMPLE_RATE,
+            'token_cache': authentication.stats(),
+            'replica_lags': routers.replica_lags(),
+        })
@@ -0,0 +1,139 @@
+import threading
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool, который при занятых соединениях ждёт
+    освободившееся до timeout секунд, а не сразу бросает PoolError.
+    """
+
+    def __init__(self, maxconn, timeout, **conn_params):
+        super().__init__(0, maxconn, **conn_params)
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                f'Нет свободного соединения в пуле за {self.timeout} с.'
+            )
+        try:
+            return super().getconn(key)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self.slots.release()
+
+
+def get_pool(alias, size, timeout, conn_params):
+    """Пул соединений процесса для алиаса базы, создаётся при первом вызове."""
+    with pools_lock:
+        connection_pool = pools.get(alias)
+        if connection_pool is None:
+            connection_pool = pools[alias] = BlockingConnectionPool(
+                size, timeout, **conn_params
+            )
+        return connection_pool
+
+
+def close_pool(alias):
+    """Закрывает все соединения пула, например перед удалением базы."""
+    with pools_lock:
+        connection_pool = pools.pop(alias, None)
+    if connection_pool is not None:
+        connection_pool.closeall()
+
+
+def ping(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с проверкой переиспользуемых соединений и пулом в процессе.
+
+    CONN_HEALTH_CHECKS: постоянное соединение проверяется перед первым
+    запросом в каждом HTTP-запросе, как в Django 4.1. POOL_SIZE: соединения
+    берутся из пула psycopg2 и возвращаются в него вместо закрытия; когда
+    все заняты, поток ждёт до POOL_TIMEOUT секунд.
+    """
+
+    health_check_done = False
+
+    @property
+    def pool_size(self):
+        return self.settings_dict.get('POOL_SIZE') or 0
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_size:
+            return super().get_new_connection(conn_params)
+        connection_pool = get_pool(
+            self.alias,
+            self.pool_size,
+            self.settings_dict.get('POOL_TIMEOUT', 10),
+            conn_params,
+        )
+        for _ in range(self.pool_size):
+            connection = connection_pool.getconn()
+            if not self.health_checks or ping(connection):
+                break
+            connection_pool.putconn(connection, close=True)
+        else:
+            connection = connection_pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        connection_pool = pools.get(self.alias)
+        if self.connection is None or connection_pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            connection_pool.putconn(
+                self.connection,
+                close=self.errors_occurred or bool(self.connection.closed),
+            )
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if (self.connection is not None and not self.health_check_done
+                and self.health_checks and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
@@ -0,0 +1,94 @@
+import os
+
+SQLITE = 'django.db.backends.sqlite3'
+POSTGRESQL = 'foodgram.backends.postgresql'
+# Штатный бэкенд PostgreSQL заменяется своим: с пулом и проверкой соединений.
+ENGINES = {
+    SQLITE: SQLITE,
+    'django.db.backends.postgresql': POSTGRESQL,
+    'django.db.backends.postgresql_psycopg2': POSTGRESQL,
+    POSTGRESQL: POSTGRESQL,
+}
+
+
+def env_bool(name, default='False'):
+    return os.getenv(name, default).lower() == 'true'
+
+
+def database_config(base_dir):
+    """
+    Настройки базы из окружения.
+
+    DB_ENGINE — django.db.backends.sqlite3 (по умолчанию) или
+    django.db.backends.postgresql. Для PostgreSQL:
+    POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, DB_HOST, DB_PORT,
+    DB_CONN_MAX_AGE (секунды, None — без ограничения), DB_CONN_HEALTH_CHECKS,
+    DB_STATEMENT_TIMEOUT (мс, 0 — без ограничения), DB_POOL_SIZE
+    (0 — без пула соединений в процессе) и DB_POOL_TIMEOUT (секунды
+    ожидания свободного соединения пула).
+    """
+    engine = os.getenv('DB_ENGINE', SQLITE)
+    if engine not in ENGINES:
+        raise ValueError(
+            f'DB_ENGINE={engine}: ожидается одно из {", ".join(ENGINES)}.'
+        )
+    if ENGINES[engine] == SQLITE:
+        return {
+            'ENGINE': SQLITE,
+            'NAME': os.getenv('SQLITE_PATH', base_dir / 'db.sqlite3'),
+        }
+    conn_max_age = os.getenv('DB_CONN_MAX_AGE', '60')
+    options = {}
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+    if statement_timeout:
+        options['options'] = f'-c statement_timeout={statement_timeout}'
+    return {
+        'ENGINE': ENGINES[engine],
+        'NAME': os.getenv('POSTGRES_DB', 'postgres'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', 'db'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': (
+            None if conn_max_age.lower() == 'none' else int(conn_max_age)
+        ),
+        'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', 'True'),
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'OPTIONS': options,
+    }
+
+
+def parse_replica(entry):
+    """'host', 'host:port', 'host/db' или 'host:port/db' реплики PostgreSQL."""
+    address, _, name = entry.partition('/')
+    host, _, port = address.partition(':')
+    return {
+        key: value
+        for key, value in (('HOST', host), ('PORT', port), ('NAME', name))
+        if value
+    }
+
+
+def replica_configs(default):
+    """
+    Реплики для чтения из DB_REPLICAS через запятую: пути к файлам для
+    SQLite или адреса для PostgreSQL. В тестах реплики указывают на
+    тестовую базу default.
+    """
+    entries = [
+        entry.strip()
+        for entry in os.getenv('DB_REPLICAS', '').split(',') if entry.strip()
+    ]
+    replicas = {}
+    for number, entry in enumerate(entries, start=1):
+        if default['ENGINE'] == SQLITE:
+            overrides = {'NAME': entry}
+        else:
+            overrides = parse_replica(entry)
+        replicas[f'replica{number}'] = {
+            **default,
+            **overrides,
+            'TEST': {'MIRROR': 'default'},
+        }
+    return replicas
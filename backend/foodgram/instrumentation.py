@@ -0,0 +1,162 @@
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# Замеры текущего запроса; None, если запрос не попал в выборку.
+current = ContextVar('request_timings', default=None)
+
+PERCENTILES = (50, 90, 99)
+
+
+class RequestTimings:
+    """Время по этапам запроса в секундах и число SQL-запросов."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self.running = set()
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - started)
+
+    def server_timing(self):
+        parts = [
+            f'db;dur={self.durations["db"] * 1000:.1f};'
+            f'desc="{self.queries} SQL"'
+        ]
+        parts.extend(
+            f'{name};dur={seconds * 1000:.1f}'
+            for name, seconds in self.durations.items() if name != 'db'
+        )
+        return ', '.join(parts)
+
+
+@contextmanager
+def measure(name):
+    """Добавляет время блока к этапу name; вложенные замеры не считаются."""
+    timings = current.get()
+    if timings is None or name in timings.running:
+        yield
+        return
+    timings.running.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.running.discard(name)
+        timings.add(name, time.perf_counter() - started)
+
+
+def percentile(values, percent):
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+class EndpointStats:
+    """Последние INSTRUMENTATION_WINDOW замеров каждого эндпоинта."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(
+            lambda: deque(maxlen=settings.INSTRUMENTATION_WINDOW)
+        )
+
+    def record(self, endpoint, sample):
+        with self.lock:
+            self.samples[endpoint].append(sample)
+
+    def summary(self):
+        """{эндпоинт: {метрика: {'p50': ..., 'p90': ..., 'p99': ...}}}."""
+        with self.lock:
+            samples = {
+                endpoint: list(values)
+                for endpoint, values in self.samples.items()
+            }
+        result = {}
+        for endpoint, values in sorted(samples.items()):
+            metrics = {}
+            for metric in sorted({key for sample in values for key in sample}):
+                series = sorted(
+                    sample[metric] for sample in values if metric in sample
+                )
+                metrics[metric] = {
+                    f'p{percent}': round(percentile(series, percent), 3)
+                    for percent in PERCENTILES
+                }
+            result[endpoint] = {'count': len(values), **metrics}
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+
+stats = EndpointStats()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.view_name if match else 'unresolved'
+    return f'{request.method} {view_name}'
+
+
+class InstrumentationMiddleware:
+    """
+    Замеряет долю INSTRUMENTATION_SAMPLE_RATE запросов: SQL, сериализацию,
+    декодирование картинок, рендеринг и размер ответа. Итог уходит в
+    заголовок Server-Timing и в stats.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        timings.add('total', time.perf_counter() - started)
+        response['Server-Timing'] = timings.server_timing()
+        sample = {
+            f'{name}_ms': seconds * 1000
+            for name, seconds in timings.durations.items()
+        }
+        sample['queries'] = timings.queries
+        if not response.streaming:
+            sample['bytes'] = len(response.content)
+        stats.record(endpoint_name(request), sample)
+        return response
+
+    def process_template_response(self, request, response):
+        timings = current.get()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: timings.add(
+                    'render', time.perf_counter() - started
+                )
+            )
+        return response
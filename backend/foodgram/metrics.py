@@ -0,0 +1,115 @@
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# Под gunicorn значения пишутся в файлы PROMETHEUS_MULTIPROC_DIR и
+# суммируются по всем процессам при каждом чтении /metrics.
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total',
+    'Обработанные HTTP-запросы.',
+    ('endpoint', 'method', 'status'),
+)
+LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки HTTP-запроса.',
+    ('endpoint', 'method'),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+QUERIES = Histogram(
+    'foodgram_http_request_db_queries',
+    'Число SQL-запросов на HTTP-запрос.',
+    ('endpoint', 'method'),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+IN_PROGRESS = Gauge(
+    'foodgram_http_requests_in_progress',
+    'HTTP-запросы, обрабатываемые прямо сейчас.',
+    multiprocess_mode='livesum',
+)
+CACHE = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешам приложения.',
+    ('cache', 'result'),
+)
+
+
+def count_cache(cache_name, result):
+    CACHE.labels(cache_name, result).inc()
+
+
+def endpoint_label(request):
+    """Имя маршрута без пространства имён api: recipes-list, users-me."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    if match.namespace == 'api' and match.url_name:
+        return match.url_name
+    return match.view_name
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Время, статус и число SQL-запросов каждого HTTP-запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with IN_PROGRESS.track_inprogress(), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        endpoint = endpoint_label(request)
+        LATENCY.labels(endpoint, request.method).observe(
+            time.perf_counter() - started
+        )
+        QUERIES.labels(endpoint, request.method).observe(counter.count)
+        REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+        return response
+
+
+def registry():
+    if not MULTIPROCESS:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus. Нужен METRICS_TOKEN; без него
+    метрики открыты только при DEBUG.
+    """
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_rows(model, using):
+    """Оценка числа строк таблицы из статистики PostgreSQL."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            (model._meta.db_table,),
+        )
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки для больших таблиц: для списка без фильтров на
+    PostgreSQL берёт оценку из pg_class вместо COUNT(*). Маленькие таблицы
+    и отфильтрованные списки считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if (query is not None and not query.where
+                and connections[queryset.db].vendor == 'postgresql'):
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate >= settings.ADMIN_ESTIMATED_COUNT_FROM:
+                return estimate
+        return super().count
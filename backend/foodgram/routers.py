@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Реплика, выбранная на время безопасного запроса к представлению с
+# репликами; None — чтения идут в default.
+replica_reads = ContextVar('replica_reads', default=None)
+
+LAG_SQL = {
+    'postgresql': (
+        'SELECT CASE WHEN NOT pg_is_in_recovery() '
+        'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+        'END'
+    ),
+}
+
+lags = {}
+lags_lock = threading.Lock()
+
+
+def measure_lag(alias):
+    """
+    Отставание реплики в секундах; None, если она недоступна. Для SQLite
+    отставание не измеряется и считается нулевым.
+    """
+    connection = connections[alias]
+    sql = LAG_SQL.get(connection.vendor)
+    try:
+        if sql is None:
+            connection.ensure_connection()
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+    return float(lag or 0)
+
+
+def replica_lags():
+    """Отставание реплик, перемеряется раз в REPLICA_LAG_CHECK_INTERVAL."""
+    now = time.monotonic()
+    with lags_lock:
+        stale = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if now - lags.get(alias, (float('-inf'), None))[0]
+            >= settings.REPLICA_LAG_CHECK_INTERVAL
+        ]
+        for alias in stale:
+            lags[alias] = (now, None)
+    for alias in stale:
+        lag = measure_lag(alias)
+        with lags_lock:
+            lags[alias] = (now, lag)
+    with lags_lock:
+        return {
+            alias: lags[alias][1] for alias in settings.DATABASE_REPLICAS
+        }
+
+
+def available_replicas():
+    return [
+        alias for alias, lag in replica_lags().items()
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG
+    ]
+
+
+def choose_replica():
+    """Одна реплика на весь запрос, чтобы страница читалась из одной базы."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    replicas = available_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def primary_reads():
+    """
+    Чтения блока идут в default. Нужно, когда результат попадает в общий
+    кеш под новой версией: с отстающей реплики туда попали бы старые строки.
+    """
+    token = replica_reads.set(None)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+def sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def mark_sticky(user):
+    """После записи пользователь REPLICA_STICKY_SECONDS читает с primary."""
+    cache.set(sticky_key(user.pk), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user):
+    return user.is_authenticated and cache.get(sticky_key(user.pk)) is not None
+
+
+class ReplicaRouter:
+    """
+    Чтения уходят на реплику из replica_reads, всё остальное — на default.
+    """
+
+    def db_for_read(self, model, **hints):
+        return replica_reads.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaStickinessMiddleware:
+    """Отмечает пользователей, отправивших изменяющий запрос."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.DATABASE_REPLICAS
+                and request.method not in ('GET', 'HEAD', 'OPTIONS')):
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                mark_sticky(user)
+        return response
@@ -3,6 +3,8 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from foodgram.database import database_config, replica_configs
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,9 +23,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -32,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
+    'foodgram.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.routers.ReplicaStickinessMiddleware',
 ]
 
 REST_FRAMEWORK = {
@@ -47,7 +54,18 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -85,12 +103,55 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 DATABASES = {
+    'default': database_config(BASE_DIR),
+}
+DATABASES.update(replica_configs(DATABASES['default']))
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+CATALOGUE_CACHE_TIMEOUT = int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 24 * 60 * 60))
+
+CATALOGUE_LOCAL_CACHE_SIZE = int(os.getenv('CATALOGUE_LOCAL_CACHE_SIZE', 1024))
+
+RECIPE_PAGE_CACHE_TIMEOUT = int(os.getenv('RECIPE_PAGE_CACHE_TIMEOUT', 5 * 60))
+
+RECIPE_PAGE_LOCK_TIMEOUT = int(os.getenv('RECIPE_PAGE_LOCK_TIMEOUT', 10))
+
+RECIPE_PAGE_LOCK_POLL = float(os.getenv('RECIPE_PAGE_LOCK_POLL', 0.05))
+
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('INSTRUMENTATION_SAMPLE_RATE', 0)
+)
+
+INSTRUMENTATION_WINDOW = int(os.getenv('INSTRUMENTATION_WINDOW', 1000))
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 5 * 60))
+
+AUTH_TOKEN_LOCAL_TTL = int(os.getenv('AUTH_TOKEN_LOCAL_TTL', 30))
+
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(
+    os.getenv('AUTH_TOKEN_LOCAL_CACHE_SIZE', 10_000)
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -127,5 +188,37 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+ADMIN_ESTIMATED_COUNT_FROM = int(
+    os.getenv('ADMIN_ESTIMATED_COUNT_FROM', 100_000)
+)
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+RECIPE_IMAGE_RENDITIONS = {
+    'card': (480, 480),
+    'detail': (1024, 1024),
+    'retina': (2048, 2048),
+}
+
+JOBS_QUEUES = {
+    'default': int(os.getenv('JOBS_DEFAULT_CONCURRENCY', 1)),
+    'images': int(os.getenv('JOBS_IMAGES_CONCURRENCY', 2)),
+    'feed': int(os.getenv('JOBS_FEED_CONCURRENCY', 1)),
+}
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False').lower() == 'true'
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+JOBS_TIMEOUT = int(os.getenv('JOBS_TIMEOUT', 10 * 60))
+
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 10_000)
+)
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,30 @@
+import os
+import shutil
+
+# Воркеры пишут метрики в файлы этого каталога, /metrics суммирует их.
+# Переменная задаётся до загрузки приложения, чтобы её увидели все воркеры.
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics'
+)
+
+# Значение по умолчанию CACHE_BACKEND в settings.py.
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def on_starting(server):
+    """Метрики прошлого запуска не должны попасть в новые значения."""
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+    if (server.cfg.workers > 1 and os.getenv(
+            'CACHE_BACKEND', LOCAL_CACHE_BACKEND) == LOCAL_CACHE_BACKEND):
+        server.log.warning(
+            'Кеш Django — LocMemCache у каждого из %s воркеров: версии '
+            'справочников и токены между ними не сбрасываются. Задайте '
+            'общий CACHE_BACKEND.', server.cfg.workers
+        )
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
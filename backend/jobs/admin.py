@@ -0,0 +1,38 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'task',
+        'queue',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'finished_at',
+    )
+    list_filter = (
+        'status',
+        'queue',
+    )
+    search_fields = ('task',)
+    readonly_fields = (
+        'locked_by',
+        'locked_at',
+        'created_at',
+        'finished_at',
+        'last_error',
+    )
+    actions = ('requeue',)
+
+    @admin.action(description='Поставить в очередь заново')
+    def requeue(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, last_error='',
+            run_at=timezone.now(), finished_at=None,
+        )
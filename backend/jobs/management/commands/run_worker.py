@@ -0,0 +1,58 @@
+import signal
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from jobs.worker import Worker
+from recipes import catalogue
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очередей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            nargs='+',
+            dest='queues',
+            help='Очереди; по умолчанию все из JOBS_QUEUES.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Потоков на очередь вместо заданных в JOBS_QUEUES.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить накопившиеся задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or list(settings.JOBS_QUEUES)
+        concurrency = {
+            queue: options['concurrency'] or settings.JOBS_QUEUES.get(queue, 1)
+            for queue in queues
+        }
+        worker = Worker(
+            concurrency,
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+        )
+        signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        if not catalogue.is_cache_shared():
+            self.stderr.write(self.style.WARNING(
+                'Кеш Django — LocMemCache: версии, которые меняют задачи, '
+                'не увидит backend. Задайте общий CACHE_BACKEND.'
+            ))
+        print('Обработчик запущен: ' + ', '.join(
+            f'{queue} x{count}' for queue, count in concurrency.items()
+        ))
+        worker.run()
+        print('Обработчик остановлен.')
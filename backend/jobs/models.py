@@ -0,0 +1,96 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    queue = models.CharField(
+        verbose_name='Очередь',
+        max_length=64,
+        default='default',
+    )
+    task = models.CharField(
+        verbose_name='Задача',
+        max_length=255,
+    )
+    args = models.JSONField(
+        verbose_name='Позиционные аргументы',
+        default=list,
+        blank=True,
+    )
+    kwargs = models.JSONField(
+        verbose_name='Именованные аргументы',
+        default=dict,
+        blank=True,
+    )
+    priority = models.SmallIntegerField(
+        verbose_name='Приоритет',
+        default=0,
+        help_text='Задачи с большим приоритетом выполняются раньше',
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+        default=3,
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Запустить не раньше',
+        default=timezone.now,
+    )
+    locked_by = models.CharField(
+        verbose_name='Обработчик',
+        max_length=255,
+        blank=True,
+    )
+    locked_at = models.DateTimeField(
+        verbose_name='Взята в работу',
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Завершена',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                fields=('queue', 'status', '-priority', 'run_at'),
+                name='job_claim_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.task} ({self.get_status_display()})'
@@ -0,0 +1,62 @@
+import functools
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+registry = {}
+
+
+class Task:
+    """Функция, которую можно поставить в очередь через delay()."""
+
+    def __init__(self, func, queue, priority, max_attempts):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, priority=None, run_at=None):
+        """
+        Создаёт задачу в текущей транзакции: обработчик увидит её только
+        после фиксации вместе с данными, которые она обрабатывает.
+        """
+        kwargs = kwargs or {}
+        if settings.JOBS_EAGER:
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+        return Job.objects.create(
+            queue=self.queue,
+            task=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            run_at=run_at or timezone.now(),
+        )
+
+
+def background(func=None, *, queue='default', priority=0, max_attempts=3):
+    """Регистрирует функцию как фоновую задачу. Аргументы — только JSON."""
+    def decorate(func):
+        task = Task(func, queue, priority, max_attempts)
+        registry[task.name] = task
+        return task
+    return decorate(func) if func is not None else decorate
+
+
+def get_task(name):
+    if name not in registry:
+        import_module(name.rsplit('.', 1)[0])
+    return registry[name]
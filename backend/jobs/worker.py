@@ -0,0 +1,162 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.tasks import get_task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 10
+
+
+def ready_jobs(queue):
+    return Job.objects.filter(
+        queue=queue, status=Job.QUEUED, run_at__lte=timezone.now()
+    ).order_by('-priority', 'run_at', 'pk')
+
+
+def claim_locked(queue, worker_name):
+    """Берёт задачу через SELECT ... FOR UPDATE SKIP LOCKED."""
+    with transaction.atomic():
+        job = ready_jobs(queue).select_for_update(skip_locked=True).first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_name
+        job.locked_at = timezone.now()
+        job.save(update_fields=(
+            'status', 'attempts', 'locked_by', 'locked_at'
+        ))
+        return job
+
+
+def claim_optimistic(queue, worker_name):
+    """
+    Без блокировок строк: задачу получает тот обработчик, чей UPDATE
+    с условием status=queued изменил строку.
+    """
+    candidates = ready_jobs(queue).values_list('pk', flat=True)
+    for pk in list(candidates[:CLAIM_CANDIDATES]):
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=worker_name,
+            locked_at=timezone.now(),
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def claim(queue, worker_name):
+    if connection.features.has_select_for_update_skip_locked:
+        return claim_locked(queue, worker_name)
+    return claim_optimistic(queue, worker_name)
+
+
+def execute(job):
+    try:
+        get_task(job.task).func(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception('Задача %s (%s) завершилась ошибкой',
+                         job.pk, job.task)
+        fail(job, traceback.format_exc())
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, finished_at=timezone.now(),
+            locked_by='', locked_at=None,
+        )
+
+
+def fail(job, error):
+    """Повторяет задачу с экспоненциальной задержкой или помечает ошибкой."""
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        changes = {
+            'status': Job.QUEUED,
+            'run_at': now + timedelta(seconds=delay),
+        }
+    else:
+        changes = {'status': Job.FAILED, 'finished_at': now}
+    Job.objects.filter(pk=job.pk).update(
+        last_error=error, locked_by='', locked_at=None, **changes
+    )
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи обработчиков, которые перестали отвечать."""
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_TIMEOUT
+        ),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(),
+        last_error='Превышено время выполнения.',
+    )
+    return stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+class Worker:
+    """
+    Обработчик очередей: на каждую очередь запускается столько потоков,
+    сколько задано в concurrency.
+    """
+
+    def __init__(self, concurrency, poll_interval=1.0, once=False):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.once = once
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def run(self):
+        requeue_stale()
+        threads = [
+            threading.Thread(
+                target=self.loop,
+                args=(queue, f'{self.name}:{queue}:{number}'),
+                name=f'worker-{queue}-{number}',
+            )
+            for queue, count in self.concurrency.items()
+            for number in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(self.poll_interval)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        self.stopping.set()
+
+    def loop(self, queue, worker_name):
+        try:
+            while not self.stopping.is_set():
+                job = claim(queue, worker_name)
+                if job is not None:
+                    execute(job)
+                    continue
+                if self.once:
+                    return
+                self.stopping.wait(self.poll_interval)
+                requeue_stale()
+        finally:
+            connection.close()
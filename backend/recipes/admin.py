@@ -1,13 +1,69 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import transaction
 
+from foodgram.paginators import EstimatedCountPaginator
+from recipes import shopping_list
+from recipes.admin_filters import input_filter
 from recipes.models import (Cart, FavoriteRecipe, Ingredient, Recipe,
                             RecipeIngredientAmount, Tag)
 
 
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """
+    AutocompleteSelect, который подписывает уже загруженный объект строки,
+    а не запрашивает выбранное значение отдельно для каждой строки.
+    """
+    loaded = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = {
+            str(item) for item in value
+            if str(item) not in self.choices.field.empty_values
+        }
+        if self.loaded is None or selected != {str(self.loaded.pk)}:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name,
+            self.loaded.pk,
+            self.choices.field.label_from_instance(self.loaded),
+            selected,
+            len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class RecipeIngredientAmountForm(forms.ModelForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.ingredient_id is not None:
+            widget = self.fields['ingredient'].widget
+            getattr(widget, 'widget', widget).loaded = self.instance.ingredient
+
+
 class RecipeIngredientAmountInline(admin.TabularInline):
     model = RecipeIngredientAmount
+    form = RecipeIngredientAmountForm
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'ingredient':
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Cart)
@@ -21,9 +77,17 @@ class CartAdmin(admin.ModelAdmin):
         'add_to_shopping_cart_date',
     )
     list_filter = (
-        'user',
-        'recipe',
+        input_filter('user__username', 'пользователю'),
+        input_filter('recipe__name__icontains', 'рецепту'),
     )
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'user', 'recipe__author'
+        ).prefetch_related('recipe__ingredients')
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -42,9 +106,13 @@ class FavoriteRecipeAdmin(admin.ModelAdmin):
         'add_to_favorite_date',
     )
     list_filter = (
-        'user',
-        'recipe',
+        input_filter('user__username', 'пользователю'),
+        input_filter('recipe__name__icontains', 'рецепту'),
     )
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Ingredient)
@@ -55,8 +123,10 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
         'measurement_unit',
     )
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
     search_fields = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Recipe)
@@ -71,21 +141,43 @@ class RecipeAdmin(admin.ModelAdmin):
         'get_tags',
     )
     list_filter = (
-        'author__username',
-        'name',
+        input_filter('author__username', 'автору'),
         'tags',
     )
     search_fields = (
         'name',
-        'author__username',
-        'tags__name',
+        '=author__username',
     )
     readonly_fields = (
         'in_favorite_count',
     )
+    autocomplete_fields = ('author',)
     inlines = (
         RecipeIngredientAmountInline,
     )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).prefetch_related('tags', 'ingredients')
+
+    def save_related(self, request, form, formsets, change):
+        old_amounts = (
+            shopping_list.recipe_amounts(form.instance.pk) if change else {}
+        )
+        super().save_related(request, form, formsets, change)
+        shopping_list.update_recipe(
+            form.instance.pk,
+            old_amounts,
+            shopping_list.recipe_amounts(form.instance.pk),
+        )
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        with shopping_list.removing_recipe(obj.pk):
+            super().delete_model(request, obj)
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -99,9 +191,10 @@ class RecipeAdmin(admin.ModelAdmin):
             tag.name for tag in obj.tags.all()
         )
 
-    @admin.display(description='Кол-во добавлений')
+    @admin.display(description='Кол-во добавлений',
+                   ordering='favorites_count')
     def in_favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(RecipeIngredientAmount)
@@ -113,6 +206,10 @@ class RecipeIngredientAmountAdmin(admin.ModelAdmin):
         'ingredient',
         'amount',
     )
+    list_select_related = ('recipe__author', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Tag)
@@ -123,6 +220,7 @@ class TagAdmin(admin.ModelAdmin):
         'name',
         'slug',
     )
-    list_filter = (
+    search_fields = (
         'name',
+        'slug',
     )
@@ -0,0 +1,38 @@
+from django.contrib import admin
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр-поле ввода вместо списка всех значений: боковая панель не
+    перечисляет каждого пользователя или рецепт.
+    """
+
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # Django показывает фильтр только при непустом списке вариантов.
+        return ((None, None),)
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        return queryset.filter(**{self.lookup: value})
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (key, value)
+            for key, value in changelist.get_filters_params().items()
+            if key != self.parameter_name
+        ]
+        yield all_choice
+
+
+def input_filter(lookup, title):
+    return type(f'InputFilter_{lookup}', (InputFilter,), {
+        'lookup': lookup,
+        'parameter_name': lookup,
+        'title': title,
+    })
@@ -0,0 +1,84 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+USERS = 'users'
+RECIPES = 'recipes'
+
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def is_cache_shared():
+    """
+    Видят ли версии другие процессы: LocMemCache живёт в памяти одного
+    процесса, и сброс в воркере или команде до backend не доходит.
+    """
+    return settings.CACHES['default']['BACKEND'] != LOCAL_CACHE_BACKEND
+
+
+def version_key(catalogue):
+    return f'catalogue:{catalogue}:version'
+
+
+def get_version(catalogue):
+    """Текущая версия справочника, общая для всех процессов."""
+    return cache.get_or_set(version_key(catalogue), time.time_ns, None)
+
+
+def bump_version(catalogue):
+    """Меняет версию справочника, сбрасывая все закешированные ответы."""
+    try:
+        return cache.incr(version_key(catalogue))
+    except ValueError:
+        version = time.time_ns()
+        cache.set(version_key(catalogue), version, None)
+        return version
+
+
+def recipe_author(author_id):
+    return f'{RECIPES}:author:{author_id}'
+
+
+def recipe_tag(slug):
+    return f'{RECIPES}:tag:{slug}'
+
+
+def get_versions(catalogues):
+    """Версии нескольких справочников за одно обращение к кешу."""
+    keys = [version_key(name) for name in catalogues]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def bump_versions(catalogues):
+    version = time.time_ns()
+    cache.set_many(
+        {version_key(name): version for name in catalogues}, None
+    )
+
+
+def recipe_pages(recipes):
+    """Версии страниц списка рецептов, на которых показаны эти рецепты."""
+    names = set()
+    for author_id, slug in recipes.order_by().values_list(
+        'author_id', 'tags__slug'
+    ).distinct():
+        names.update((RECIPES, recipe_author(author_id)))
+        if slug is not None:
+            names.add(recipe_tag(slug))
+    return names
+
+
+def bump_on_commit(catalogues):
+    """Меняет версии после фиксации транзакции, чтобы кеш не опередил базу."""
+    catalogues = set(catalogues)
+    transaction.on_commit(lambda: bump_versions(catalogues))
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core import checks
+
+from recipes import catalogue
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or catalogue.is_cache_shared():
+        return []
+    return [checks.Warning(
+        'Кеш Django — LocMemCache: backend, worker и команды manage.py не '
+        'видят версий справочников друг друга и отдают устаревшие ответы.',
+        hint='Задайте CACHE_BACKEND и CACHE_LOCATION общего кеша, например '
+             'memcached из docker-compose.',
+        id='recipes.W001',
+    )]
@@ -0,0 +1,47 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Cart, FavoriteRecipe, Recipe
+from users.models import Subscription, User
+
+# Счётчик: (модель, поле, модель связи, поле связи с моделью).
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'carts_count', Cart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+    (User, 'following_count', Subscription, 'user'),
+)
+
+
+def increment(model, pk, field):
+    model.objects.filter(pk=pk).update(**{field: F(field) + 1})
+
+
+def decrement(model, pk, field):
+    model.objects.filter(pk=pk, **{f'{field}__gt': 0}).update(
+        **{field: F(field) - 1}
+    )
+
+
+def actual_count(related_model, relation):
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            value=Count('pk')
+        ).values('value')
+    ), 0)
+
+
+def reconcile():
+    """Пересчитывает счётчики по таблицам связей: {поле: исправлено строк}."""
+    fixed = {}
+    for model, field, related_model, relation in COUNTERS:
+        drifted = model.objects.annotate(
+            actual=actual_count(related_model, relation)
+        ).exclude(**{field: F('actual')}).values('pk')
+        fixed[f'{model.__name__}.{field}'] = model.objects.filter(
+            pk__in=drifted
+        ).update(**{field: actual_count(related_model, relation)})
+    return fixed
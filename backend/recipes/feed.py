@@ -0,0 +1,146 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from jobs.tasks import background
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, User
+
+BATCH_SIZE = 1000
+
+
+def bulk_create_in_batches(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fans_out(followers_count):
+    """Разносить ли рецепты автора по лентам подписчиков при публикации."""
+    return followers_count < settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+@background(queue='feed')
+def fan_out(recipe_id):
+    """Добавляет рецепт в ленты всех подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'pub_date', 'author__followers_count'
+    ).first()
+    if recipe is None or not fans_out(recipe['author__followers_count']):
+        return
+    author_id = recipe['author_id']
+    bulk_create_in_batches(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=recipe['pub_date'],
+        )
+        for user_id in followers(author_id)
+    )
+
+
+def followers(author_id):
+    return Subscription.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    ).iterator(chunk_size=BATCH_SIZE)
+
+
+def latest_recipes(author_id):
+    """Последние FEED_BACKFILL_SIZE рецептов автора: [(id, pub_date)]."""
+    return list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE])
+
+
+def backfill(user_id, author_id):
+    """Последние рецепты автора — в ленту подписчика."""
+    bulk_create_in_batches(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for recipe_id, pub_date in latest_recipes(author_id)
+    )
+
+
+@background(queue='feed')
+def backfill_followers(author_id):
+    """
+    Последние рецепты автора — в ленты всех подписчиков. Нужно, когда
+    подписчиков стало меньше FEED_FANOUT_MAX_FOLLOWERS: рецепты, которые
+    раньше подмешивались при чтении, иначе пропали бы из лент.
+    """
+    recipes = latest_recipes(author_id)
+    bulk_create_in_batches(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in followers(author_id)
+        for recipe_id, pub_date in recipes
+    )
+
+
+def unfollowed(author_id):
+    """После отписки: ставит backfill_followers, если автор опустился ниже
+    порога разноса."""
+    followers_count = User.objects.filter(pk=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    if (followers_count is not None and fans_out(followers_count)
+            and not fans_out(followers_count + 1)):
+        backfill_followers.delay(author_id)
+
+
+def trim(user_id, author_id):
+    """Убирает рецепты автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Заполняет ленты заново по текущим подпискам."""
+    FeedEntry.objects.all().delete()
+    for user_id, author_id in Subscription.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator(chunk_size=BATCH_SIZE):
+        backfill(user_id, author_id)
+
+
+def older_than(position, pk_field):
+    """Записи после position = (pub_date, id рецепта) в порядке ленты."""
+    pub_date, recipe_id = position
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{pk_field}__lt': recipe_id}
+    )
+
+
+def page(user, after=None, size=10):
+    """
+    До size позиций (pub_date, id рецепта) ленты от новых к старым, строго
+    после after. Записи ленты читаются по индексу (user, -pub_date,
+    -recipe); рецепты авторов, у которых слишком много подписчиков для
+    разноса, подмешиваются в том же запросе через UNION ALL.
+    """
+    big_authors = User.objects.filter(
+        author_in_subscription__user=user,
+        followers_count__gte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values('pk')
+    entries = FeedEntry.objects.filter(user=user).exclude(
+        author_id__in=big_authors
+    )
+    recipes = Recipe.objects.filter(author_id__in=big_authors).order_by()
+    if after is not None:
+        entries = entries.filter(older_than(after, 'recipe_id'))
+        recipes = recipes.filter(older_than(after, 'pk'))
+    return list(entries.values_list('pub_date', 'recipe_id').union(
+        recipes.values_list('pub_date', 'pk'), all=True
+    ).order_by('-pub_date', '-recipe_id')[:size])
@@ -0,0 +1,109 @@
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from jobs.tasks import background
+from recipes import catalogue
+from recipes.models import Recipe
+from recipes.storage import digest_of
+
+RENDITIONS_DIR = 'recipes/renditions'
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True,
+             'progressive': True},
+}
+
+
+def rendition_names(image_name):
+    """Имена копий картинки: {'card': {'webp': ..., 'jpeg': ...}, ...}."""
+    if not image_name:
+        return {}
+    digest = digest_of(image_name)
+    return {
+        size: {
+            image_format: posixpath.join(
+                RENDITIONS_DIR, digest, f'{size}.{image_format}'
+            )
+            for image_format in FORMATS
+        }
+        for size in settings.RECIPE_IMAGE_RENDITIONS
+    }
+
+
+def renditions_stale(recipe):
+    return recipe.image_renditions != rendition_names(recipe.image.name)
+
+
+def encode(image, image_format):
+    options = dict(FORMATS[image_format])
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A')
+                         if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def make_renditions(image_field):
+    """Создаёт недостающие копии картинки и возвращает их имена."""
+    names = rendition_names(image_field.name)
+    missing = {
+        size: formats
+        for size, formats in names.items()
+        if not all(default_storage.exists(name) for name in formats.values())
+    }
+    if not missing:
+        return names
+    with image_field.storage.open(image_field.name) as original:
+        source = ImageOps.exif_transpose(Image.open(original))
+        source = source.convert(
+            'RGBA' if 'A' in source.getbands() else 'RGB'
+        )
+    for size, formats in missing.items():
+        image = source.copy()
+        image.thumbnail(
+            settings.RECIPE_IMAGE_RENDITIONS[size], Image.LANCZOS
+        )
+        for image_format, name in formats.items():
+            if not default_storage.exists(name):
+                default_storage.save(name, encode(image, image_format))
+    return names
+
+
+@background(queue='images')
+def generate_renditions(recipe_id):
+    recipe = Recipe.objects.only('image', 'image_renditions').filter(
+        pk=recipe_id
+    ).first()
+    if recipe is None or not recipe.image or not renditions_stale(recipe):
+        return
+    names = make_renditions(recipe.image)
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_renditions=names, updated_at=timezone.now())
+    if updated:
+        catalogue.bump_on_commit(catalogue.recipe_pages(
+            Recipe.objects.filter(pk=recipe_id)
+        ))
+
+
+def rendition_urls(recipe, request=None):
+    if not recipe.image_renditions:
+        return None
+    urls = {}
+    for size, formats in recipe.image_renditions.items():
+        urls[size] = {}
+        for image_format, name in formats.items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[size][image_format] = url
+    return urls
@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from recipes import catalogue
+from recipes.models import Ingredient, Tag
+from recipes.search import ingredient_index
+
+BATCH_SIZE = 5000
+FORMATS = ('csv', 'json', 'jsonl')
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    """Описание справочника: поля файла, ключ уникальности и что обновлять."""
+
+    model: type
+    fields: tuple
+    unique: tuple
+    update: tuple = ()
+
+    def key(self, row):
+        return tuple(row[field] for field in self.unique)
+
+    def object_key(self, obj):
+        return tuple(getattr(obj, field) for field in self.unique)
+
+
+INGREDIENTS = ImportSpec(
+    model=Ingredient,
+    fields=('name', 'measurement_unit'),
+    unique=('name', 'measurement_unit'),
+)
+TAGS = ImportSpec(
+    model=Tag,
+    fields=('name', 'color', 'slug'),
+    unique=('slug',),
+    update=('name', 'color'),
+)
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    started: float = 0.0
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f'обработано строк: {self.rows} за {self.elapsed:.1f} с '
+                f'({self.rate:.0f} строк/с)')
+
+
+def detect_format(path):
+    suffix = Path(path).suffix.lstrip('.').lower()
+    if suffix not in FORMATS:
+        raise ValueError(
+            f'Неизвестный формат файла {path}: ожидается '
+            f'{", ".join(FORMATS)}.'
+        )
+    return suffix
+
+
+def read_rows(path, fields, file_format=None):
+    """Построчно читает CSV (без заголовка), JSON-массив или JSON Lines."""
+    file_format = file_format or detect_format(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            for row in csv.reader(f):
+                if row:
+                    yield dict(zip(fields, (value.strip() for value in row)))
+        elif file_format == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def deduplicate(spec, batch):
+    """Оставляет последнюю строку для каждого ключа уникальности."""
+    return list({
+        spec.key(row): {field: row[field] for field in spec.fields}
+        for row in batch
+    }.values())
+
+
+def write_batch_orm(spec, batch):
+    model = spec.model
+    existing = {}
+    if spec.update:
+        # В Django 3.2 у bulk_create нет update_conflicts: существующие
+        # строки обновляются через bulk_update, новые вставляются отдельно.
+        # Для обновляемых справочников ключ уникальности — одно поле.
+        field, = spec.unique
+        existing = {
+            spec.object_key(obj): obj
+            for obj in model.objects.filter(**{
+                f'{field}__in': [row[field] for row in batch]
+            })
+        }
+    changed = []
+    for row in batch:
+        obj = existing.get(spec.key(row))
+        if obj is None:
+            continue
+        if any(getattr(obj, field) != row[field] for field in spec.update):
+            for field in spec.update:
+                setattr(obj, field, row[field])
+            changed.append(obj)
+    if changed:
+        model.objects.bulk_update(changed, spec.update)
+    model.objects.bulk_create(
+        (model(**row) for row in batch if spec.key(row) not in existing),
+        ignore_conflicts=True,
+    )
+
+
+def create_staging_table(spec, cursor):
+    table = connection.ops.quote_name(spec.model._meta.db_table)
+    columns = ', '.join(map(connection.ops.quote_name, spec.fields))
+    cursor.execute(
+        f'CREATE TEMPORARY TABLE import_staging ON COMMIT DROP AS '
+        f'SELECT {columns} FROM {table} WITH NO DATA'
+    )
+
+
+def write_batch_copy(spec, batch, cursor):
+    """COPY пачки во временную таблицу и слияние через ON CONFLICT."""
+    quote = connection.ops.quote_name
+    table = quote(spec.model._meta.db_table)
+    columns = ', '.join(map(quote, spec.fields))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([row[field] for field in spec.fields] for row in batch)
+    buffer.seek(0)
+    cursor.execute('TRUNCATE import_staging')
+    cursor.copy_expert(
+        f'COPY import_staging ({columns}) FROM STDIN WITH (FORMAT csv)',
+        buffer,
+    )
+    conflict = ', '.join(map(quote, spec.unique))
+    if spec.update:
+        assignments = ', '.join(
+            f'{quote(field)} = EXCLUDED.{quote(field)}'
+            for field in spec.update
+        )
+        changed = ' OR '.join(
+            f'{table}.{quote(field)} IS DISTINCT FROM EXCLUDED.{quote(field)}'
+            for field in spec.update
+        )
+        action = f'DO UPDATE SET {assignments} WHERE {changed}'
+    else:
+        action = 'DO NOTHING'
+    cursor.execute(
+        f'INSERT INTO {table} ({columns}) '
+        f'SELECT {columns} FROM import_staging '
+        f'ON CONFLICT ({conflict}) {action}'
+    )
+
+
+def finish(spec):
+    """Массовая запись идёт мимо сигналов, поэтому сбрасываем кеши сами."""
+    if spec.model is Ingredient:
+        ingredient_index.invalidate()
+    elif spec.model is Tag:
+        catalogue.bump_on_commit({catalogue.TAGS})
+
+
+def import_file(spec, path, file_format=None, batch_size=BATCH_SIZE,
+                progress=None):
+    """
+    Загружает справочник из файла пачками по batch_size строк.
+
+    На PostgreSQL пачки идут через COPY во временную таблицу, на остальных
+    базах — через bulk_create. После каждой пачки вызывается
+    progress(stats).
+    """
+    stats = ImportStats(started=time.monotonic())
+    rows = read_rows(path, spec.fields, file_format)
+    use_copy = connection.vendor == 'postgresql'
+    with transaction.atomic(), connection.cursor() as cursor:
+        count_before = spec.model.objects.count()
+        if use_copy:
+            create_staging_table(spec, cursor)
+        for batch in batches(rows, batch_size):
+            stats.rows += len(batch)
+            batch = deduplicate(spec, batch)
+            if use_copy:
+                write_batch_copy(spec, batch, cursor)
+            else:
+                write_batch_orm(spec, batch)
+            if progress is not None:
+                progress(stats)
+        stats.created = spec.model.objects.count() - count_before
+        transaction.on_commit(lambda: finish(spec))
+    return stats
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+
+from recipes import importer
+
+DATA_DIR = Path(__file__).resolve().parent / 'commands' / 'data'
+
+
+class ImportCommand(BaseCommand):
+    """Общая часть команд загрузки справочников."""
+
+    spec = None
+    file_name = None
+    title = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=DATA_DIR / self.file_name,
+            type=Path,
+            help=('Файл или каталог с данными; по умолчанию '
+                  f'data/{self.file_name} рядом с командой.'),
+        )
+        parser.add_argument(
+            '--format',
+            choices=importer.FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=importer.BATCH_SIZE,
+            help='Сколько строк записывать за один раз.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        path = options['path']
+        if path.is_dir():
+            path = path / self.file_name
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден.')
+        print(f'Загрузка данных из {path}')
+        try:
+            stats = importer.import_file(
+                self.spec,
+                path,
+                file_format=options['format'],
+                batch_size=options['batch_size'],
+                progress=lambda stats: print(f'  {stats}'),
+            )
+        except (ValueError, KeyError) as error:
+            raise CommandError(f'Ошибка в данных: {error}')
+        print(f'Загрузка {self.title} завершена: {stats}, '
+              f'добавлено записей: {stats.created}.')
@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+
+from recipes.images import generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие уменьшенные копии картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe',
+            type=int,
+            nargs='+',
+            dest='recipe_ids',
+            help='id рецептов; по умолчанию обрабатываются все.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by('pk')
+        if options['recipe_ids']:
+            recipes = recipes.filter(pk__in=options['recipe_ids'])
+        count = 0
+        for recipe_id in recipes.values_list('pk', flat=True).iterator():
+            generate_renditions(recipe_id)
+            count += 1
+        print(f'Обработано рецептов: {count}.')
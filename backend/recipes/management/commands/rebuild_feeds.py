@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes import feed
+from recipes.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок заново по текущим подпискам.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            feed.rebuild()
+        print(f'Записей в лентах: {FeedEntry.objects.count()}')
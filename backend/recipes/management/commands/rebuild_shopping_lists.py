@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводные списки покупок по корзинам пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            nargs='+',
+            dest='user_ids',
+            help='id пользователей; по умолчанию пересчитываются все.',
+        )
+
+    def handle(self, *args, **options):
+        shopping_list.rebuild(options['user_ids'])
+        print('Списки покупок пересчитаны.')
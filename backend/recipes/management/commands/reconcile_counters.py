@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики избранного, корзин, рецептов и подписок.'
+
+    def handle(self, *args, **options):
+        for counter, fixed in counters.reconcile().items():
+            print(f'{counter}: исправлено строк: {fixed}')
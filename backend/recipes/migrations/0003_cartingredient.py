@@ -0,0 +1,61 @@
+# Generated by Django 3.2 on 2026-10-18 02:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_cart_ingredients(apps, schema_editor):
+    CartIngredient = apps.get_model('recipes', 'CartIngredient')
+    RecipeIngredientAmount = apps.get_model(
+        'recipes', 'RecipeIngredientAmount'
+    )
+    totals = RecipeIngredientAmount.objects.filter(
+        recipe__shopping_cart__isnull=False
+    ).values(
+        'ingredient_id',
+        cart_user_id=models.F('recipe__shopping_cart__user_id'),
+    ).annotate(total=models.Sum('amount')).order_by()
+    CartIngredient.objects.bulk_create(
+        (
+            CartIngredient(
+                user_id=row['cart_user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total'],
+            )
+            for row in totals
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0002_auto_20240105_2105'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списке покупок',
+                'default_related_name': 'cart_ingredients',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cartingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_user_cart_ingredient'),
+        ),
+        migrations.RunPython(
+            fill_cart_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def search_indexes():
+    # Выражение зафиксировано на момент миграции, а не импортируется из
+    # recipes.search: изменение поиска требует новой миграции индекса.
+    search_vector = (
+        SearchVector('name', weight='A', config='russian')
+        + SearchVector('text', weight='B', config='russian')
+    )
+    return (
+        GinIndex(search_vector, name='recipe_search_vector_idx'),
+        GinIndex(
+            fields=['name'],
+            name='recipe_name_trgm_idx',
+            opclasses=['gin_trgm_ops'],
+        ),
+    )
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for index in search_indexes():
+        schema_editor.add_index(Recipe, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for index in search_indexes():
+        schema_editor.remove_index(Recipe, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_cartingredient'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
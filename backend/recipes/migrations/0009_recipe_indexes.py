@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', 'name', 'id'], name='recipe_pub_date_name_idx'),
+        ),
+        # Фильтр по тегам идёт от тега к рецептам: индекс покрывает связь
+        # целиком, таблица рецептов-тегов не читается.
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON recipes_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX recipe_tags_tag_recipe_idx',
+        ),
+    ]
@@ -4,7 +4,10 @@ from django.core.validators import (MaxValueValidator,
                                     )
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import (Exists, F, OuterRef, Prefetch, UniqueConstraint,
+                              Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
 from api.constants import (LENGTH_TEXT,
                            LENGTH_HEX,
@@ -12,6 +15,8 @@ from api.constants import (LENGTH_TEXT,
                            LENGTH_MAX_TIME,
                            LENGTH_MAX_QUANTITY,
                            )
+from recipes.storage import ContentAddressedStorage
+from users.models import Subscription
 
 User = get_user_model()
 
@@ -77,6 +82,85 @@ class Ingredient(models.Model):
         )
 
 
+def recipe_prefetches():
+    return (
+        'tags',
+        Prefetch(
+            'recipeingredientamount_set',
+            queryset=RecipeIngredientAmount.objects.select_related(
+                'ingredient'
+            ).order_by('ingredient__name'),
+        ),
+    )
+
+
+def prefetch_recipe_previews(authors, limit=None):
+    """
+    Рецепты авторов в author.recipe_previews: при заданном limit —
+    первые limit рецептов каждого автора одним запросом.
+    """
+    queryset = Recipe.objects.all()
+    if limit is not None:
+        queryset = queryset.first_per_author(
+            [author.pk for author in authors], limit
+        )
+    models.prefetch_related_objects(authors, Prefetch(
+        'recipe_author', queryset=queryset, to_attr='recipe_previews'
+    ))
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def first_per_author(self, author_ids, limit):
+        """Первые limit рецептов каждого автора по ROW_NUMBER() OVER."""
+        ranked = Recipe.objects.filter(author_id__in=author_ids).annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=(F('pub_date').desc(), F('name').asc(),
+                          F('id').asc()),
+            )
+        ).order_by().values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.row_number <= %s',
+            (*params, limit),
+        ))
+
+    def with_related(self):
+        """Автор, теги и ингредиенты рецептов за постоянное число запросов."""
+        return self.select_related('author').prefetch_related(
+            *recipe_prefetches()
+        )
+
+    def with_user_flags(self, user):
+        """Признаки избранного, корзины и подписки для пользователя."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_author_subscribed=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(Cart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_author_subscribed=Exists(Subscription.objects.filter(
+                user=user, author=OuterRef('author')
+            )),
+        )
+
+
 class Recipe(models.Model):
 
     author = models.ForeignKey(
@@ -93,6 +177,13 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='recipes/images/',
+        storage=ContentAddressedStorage(),
+    )
+    image_renditions = models.JSONField(
+        verbose_name='Уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False,
     )
     text = models.TextField(
         verbose_name='Описание',
@@ -122,11 +213,35 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date', 'name',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=['-pub_date', 'name', 'id'],
+                name='recipe_pub_date_name_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.name}, автор {self.author.username}.'
@@ -226,3 +341,82 @@ class Cart(AbstractUsersRecipe):
         default_related_name = 'shopping_cart'
         verbose_name = 'Рецепт в корзине'
         verbose_name_plural = 'Рецепты в корзине'
+
+
+class CartIngredient(models.Model):
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        default_related_name = 'cart_ingredients'
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_cart_ingredient',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} :: {self.ingredient} :: {self.amount}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика, записывается при публикации рецепта."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+
+    class Meta:
+        default_related_name = 'feed_entries'
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_feed_recipe',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_entry_user_author_idx',
+            ),
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_entry_user_pub_date_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} :: {self.recipe_id}'
@@ -0,0 +1,208 @@
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connections, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from recipes import catalogue
+from recipes.models import Ingredient
+
+NGRAM = 3
+
+SEARCH_CONFIG = 'russian'
+TRIGRAM_THRESHOLD = 0.3
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+def ngrams(key):
+    return {key[i:i + NGRAM] for i in range(len(key) - NGRAM + 1)}
+
+
+class IngredientSearchIndex:
+    """
+    Индекс названий ингредиентов в памяти процесса.
+
+    Отсортированный массив ключей отвечает за поиск по префиксу,
+    триграммный индекс — за поиск по подстроке. Индекс привязан к версии
+    справочника ингредиентов в кеше: другие процессы перестраивают свою
+    копию, когда она меняется. Поэтому кеш Django должен быть общим для
+    процессов (memcached в docker-compose): с LocMemCache каждый процесс
+    видит только свою версию и не замечает чужих изменений.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.keys = {}
+        self.sorted_keys = []
+        self.grams = defaultdict(set)
+
+    def build(self):
+        with self.lock:
+            version = catalogue.get_version(catalogue.INGREDIENTS)
+            self.keys = {}
+            self.sorted_keys = []
+            self.grams = defaultdict(set)
+            for pk, name in Ingredient.objects.values_list(
+                'pk', 'name'
+            ).iterator():
+                self._insert(pk, name)
+            self.sorted_keys.sort()
+            self.version = version
+
+    def ensure_fresh(self):
+        if (self.version is None or self.version
+                != catalogue.get_version(catalogue.INGREDIENTS)):
+            self.build()
+
+    def _insert(self, pk, name, keep_sorted=False):
+        key = normalize(name)
+        self.keys[pk] = key
+        if keep_sorted:
+            insort(self.sorted_keys, (key, pk))
+        else:
+            self.sorted_keys.append((key, pk))
+        for gram in ngrams(key):
+            self.grams[gram].add(pk)
+
+    def _delete(self, pk):
+        key = self.keys.pop(pk, None)
+        if key is None:
+            return
+        position = bisect_left(self.sorted_keys, (key, pk))
+        if self.sorted_keys[position:position + 1] == [(key, pk)]:
+            del self.sorted_keys[position]
+        for gram in ngrams(key):
+            self.grams[gram].discard(pk)
+
+    def _apply(self, pk, name=None):
+        """
+        Меняет индекс процесса и версию справочника. Если между прошлой и
+        новой версией других изменений не было, индекс остаётся актуальным,
+        иначе перестраивается при следующем поиске.
+        """
+        with self.lock:
+            self._delete(pk)
+            if name is not None:
+                self._insert(pk, name, keep_sorted=True)
+            version = catalogue.bump_version(catalogue.INGREDIENTS)
+            if self.version is not None and self.version + 1 == version:
+                self.version = version
+            else:
+                self.version = None
+
+    def update(self, pk, name):
+        """Изменения применяются после фиксации транзакции: откаченное
+        название в индекс не попадает."""
+        transaction.on_commit(lambda: self._apply(pk, name))
+
+    def remove(self, pk):
+        transaction.on_commit(lambda: self._apply(pk))
+
+    def invalidate(self):
+        """Сбрасывает индекс во всех процессах после массовых изменений."""
+        transaction.on_commit(self._invalidate)
+
+    def _invalidate(self):
+        with self.lock:
+            self.version = None
+            catalogue.bump_version(catalogue.INGREDIENTS)
+
+    def search(self, value, limit=None):
+        """id ингредиентов: сначала по префиксу, затем по подстроке."""
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        key = normalize(value)
+        with self.lock:
+            self.ensure_fresh()
+            found = []
+            position = bisect_left(self.sorted_keys, (key,))
+            for name, pk in self.sorted_keys[position:position + limit]:
+                if not name.startswith(key):
+                    break
+                found.append(pk)
+            if len(found) == limit or not key:
+                return found
+            return found + self._substring_matches(key, set(found), limit)
+
+    def _substring_matches(self, key, exclude, limit):
+        if len(key) >= NGRAM:
+            candidates = set.intersection(
+                *(self.grams.get(gram, set()) for gram in ngrams(key))
+            )
+        else:
+            candidates = self.keys.keys()
+        matches = []
+        for pk in candidates:
+            name = self.keys[pk]
+            position = name.find(key)
+            if position > 0 and pk not in exclude:
+                matches.append((position, name, pk))
+        matches.sort()
+        return [pk for _, _, pk in matches[:limit - len(exclude)]]
+
+
+ingredient_index = IngredientSearchIndex()
+
+
+def recipe_search_vector():
+    """
+    Выражение, по которому построен GIN-индекс полнотекстового поиска
+    (миграция 0004 хранит его копию).
+    """
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def search_recipes(queryset, value):
+    """Поиск рецептов по названию и описанию, по убыванию релевантности."""
+    if connections[queryset.db].vendor == 'postgresql':
+        return postgres_search(queryset, value)
+    return fallback_search(queryset, value)
+
+
+def postgres_search(queryset, value):
+    query = SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.annotate(
+        search_vector=recipe_search_vector(),
+        search_rank=SearchRank(recipe_search_vector(), query),
+        search_similarity=TrigramSimilarity('name', value),
+    ).filter(
+        Q(search_vector=query) | Q(name__trigram_similar=value)
+    ).order_by('-search_rank', '-search_similarity', '-pub_date', 'name')
+
+
+def contains(field, word, lookup='contains'):
+    """LIKE в SQLite не различает регистр только для ASCII."""
+    condition = Q()
+    for variant in {word, word.lower(), word.capitalize(), word.upper()}:
+        condition |= Q(**{f'{field}__{lookup}': variant})
+    return condition
+
+
+def fallback_search(queryset, value):
+    """Медленный поиск через LIKE для баз без полнотекстовых индексов."""
+    words = value.split()
+    if not words:
+        return queryset
+    in_name = Q()
+    for word in words:
+        queryset = queryset.filter(
+            contains('name', word) | contains('text', word)
+        )
+        in_name &= contains('name', word)
+    return queryset.annotate(search_rank=Case(
+        When(contains('name', value, 'startswith'), then=Value(3)),
+        When(contains('name', value), then=Value(2)),
+        When(in_name, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )).order_by('-search_rank', '-pub_date', 'name')
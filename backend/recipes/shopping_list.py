@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from recipes.models import Cart, CartIngredient, RecipeIngredientAmount
+
+BATCH_SIZE = 1000
+
+removed_recipes = ContextVar('removed_recipes', default=frozenset())
+
+
+def bulk_create_in_batches(objects):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, BATCH_SIZE))
+        if not batch:
+            return
+        CartIngredient.objects.bulk_create(batch)
+
+
+def recipe_amounts(recipe_id):
+    """Количество каждого ингредиента в рецепте: {ingredient_id: amount}."""
+    return dict(
+        RecipeIngredientAmount.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount')
+    )
+
+
+def amounts_diff(old, new):
+    return {
+        ingredient_id: new.get(ingredient_id, 0) - old.get(ingredient_id, 0)
+        for ingredient_id in old.keys() | new.keys()
+        if new.get(ingredient_id, 0) != old.get(ingredient_id, 0)
+    }
+
+
+def change_totals(user_ids, changes):
+    """Прибавляет изменения {ingredient_id: delta} к спискам покупок."""
+    changes = {
+        ingredient_id: delta
+        for ingredient_id, delta in changes.items() if delta
+    }
+    if not user_ids or not changes:
+        return
+    with transaction.atomic():
+        rows = CartIngredient.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=changes
+        )
+        existing = set(rows.values_list('user_id', 'ingredient_id'))
+        rows.update(amount=F('amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in changes.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        bulk_create_in_batches(
+            CartIngredient(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                amount=delta,
+            )
+            for user_id in user_ids
+            for ingredient_id, delta in changes.items()
+            if delta > 0 and (user_id, ingredient_id) not in existing
+        )
+        CartIngredient.objects.filter(
+            user_id__in=user_ids, amount__lte=0
+        ).delete()
+
+
+def add_recipe(user_id, recipe_id):
+    change_totals([user_id], recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_id, recipe_id):
+    if recipe_id in removed_recipes.get():
+        return
+    change_totals([user_id], {
+        ingredient_id: -amount
+        for ingredient_id, amount in recipe_amounts(recipe_id).items()
+    })
+
+
+def update_recipe(recipe_id, old_amounts, new_amounts):
+    """Переносит правку ингредиентов рецепта в корзины пользователей."""
+    changes = amounts_diff(old_amounts, new_amounts)
+    if not changes:
+        return
+    change_totals(
+        list(Cart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)),
+        changes,
+    )
+
+
+@contextmanager
+def removing_recipe(recipe_id):
+    """
+    Удаление рецепта: вместо пересчёта на каждую корзину вычитает рецепт
+    из всех списков покупок одним обновлением в той же транзакции.
+    """
+    user_ids = list(
+        Cart.objects.filter(recipe_id=recipe_id).values_list(
+            'user_id', flat=True
+        )
+    )
+    if user_ids:
+        change_totals(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount in recipe_amounts(recipe_id).items()
+        })
+    token = removed_recipes.set(removed_recipes.get() | {recipe_id})
+    try:
+        yield
+    finally:
+        removed_recipes.reset(token)
+
+
+def rebuild(user_ids=None):
+    """Пересчитывает списки покупок с нуля по корзинам."""
+    cart_filter = {'recipe__shopping_cart__isnull': False}
+    stored = CartIngredient.objects.all()
+    if user_ids is not None:
+        cart_filter = {'recipe__shopping_cart__user_id__in': user_ids}
+        stored = stored.filter(user_id__in=user_ids)
+    totals = RecipeIngredientAmount.objects.filter(**cart_filter).values(
+        'ingredient_id', cart_user_id=F('recipe__shopping_cart__user_id')
+    ).annotate(total=Sum('amount')).order_by()
+    with transaction.atomic():
+        stored.delete()
+        bulk_create_in_batches(
+            CartIngredient(
+                user_id=row['cart_user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total'],
+            )
+            for row in totals.iterator(chunk_size=BATCH_SIZE)
+        )
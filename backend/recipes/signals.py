@@ -0,0 +1,121 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from recipes import catalogue, counters, feed, shopping_list
+from recipes.images import generate_renditions, renditions_stale
+from recipes.models import Cart, FavoriteRecipe, Ingredient, Recipe, Tag
+from users.models import User
+from recipes.search import ingredient_index
+
+
+@receiver(post_save, sender=Cart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=Cart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def count_favorite(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(Recipe, instance.recipe_id, 'favorites_count')
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def uncount_favorite(sender, instance, **kwargs):
+    counters.decrement(Recipe, instance.recipe_id, 'favorites_count')
+
+
+@receiver(post_save, sender=Cart)
+def count_cart(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(Recipe, instance.recipe_id, 'carts_count')
+
+
+@receiver(post_delete, sender=Cart)
+def uncount_cart(sender, instance, **kwargs):
+    counters.decrement(Recipe, instance.recipe_id, 'carts_count')
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(User, instance.author_id, 'recipes_count')
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_recipe(sender, instance, **kwargs):
+    counters.decrement(User, instance.author_id, 'recipes_count')
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out.delay(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if instance.image and renditions_stale(instance):
+        generate_renditions.delay(instance.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_index(sender, instance, **kwargs):
+    ingredient_index.update(instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Ingredient)
+def remove_from_ingredient_index(sender, instance, **kwargs):
+    ingredient_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    catalogue.bump_on_commit({catalogue.TAGS})
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(pre_delete, sender=Recipe)
+def invalidate_recipe_pages(sender, instance, **kwargs):
+    catalogue.bump_on_commit(catalogue.recipe_pages(
+        Recipe.objects.filter(pk=instance.pk)
+    ))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_tagged_pages(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    if not reverse:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+    elif pk_set is None:
+        recipes = Recipe.objects.filter(tags=instance)
+    else:
+        recipes = Recipe.objects.filter(pk__in=pk_set)
+    catalogue.bump_on_commit(catalogue.recipe_pages(recipes))
+
+
+@receiver(pre_save, sender=Tag)
+def invalidate_renamed_tag_pages(sender, instance, **kwargs):
+    old_slug = Tag.objects.filter(pk=instance.pk).values_list(
+        'slug', flat=True
+    ).first()
+    if old_slug is not None and old_slug != instance.slug:
+        catalogue.bump_on_commit({catalogue.recipe_tag(old_slug)})
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag_pages(sender, instance, **kwargs):
+    catalogue.bump_on_commit(
+        catalogue.recipe_pages(Recipe.objects.filter(tags=instance))
+        | {catalogue.recipe_tag(instance.slug)}
+    )
@@ -0,0 +1,43 @@
+import hashlib
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def digest_of(name):
+    """sha256 содержимого, зашитый в имя файла хранилища."""
+    return posixpath.splitext(posixpath.basename(name))[0]
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла — sha256 его содержимого.
+
+    Одинаковые загрузки сохраняются один раз: повторная запись возвращает
+    имя уже существующего файла.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        digest = file_digest(content)
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest[:2], f'{digest}{extension}'
+        )
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
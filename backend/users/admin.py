@@ -1,5 +1,8 @@
 from django.contrib import admin
 
+from foodgram.paginators import EstimatedCountPaginator
+from recipes.admin_filters import input_filter
+
 from .models import Subscription, User
 
 
@@ -15,17 +18,25 @@ class UserAdmin(admin.ModelAdmin):
         'count_recipe',
     )
     list_filter = (
-        'email',
-        'username',
+        'is_staff',
+        'is_active',
     )
+    search_fields = (
+        '^username',
+        '^email',
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
-    @admin.display(description='Количество подписок')
+    @admin.display(description='Количество подписок',
+                   ordering='followers_count')
     def count_following(self, obj):
-        return obj.author_in_subscription.count()
+        return obj.followers_count
 
-    @admin.display(description='Количество рецептов в избранном')
+    @admin.display(description='Количество рецептов в избранном',
+                   ordering='recipes_count')
     def count_recipe(self, obj):
-        return obj.recipe_author.count()
+        return obj.recipes_count
 
 
 @admin.register(Subscription)
@@ -37,6 +48,10 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'subscription_date',
     )
     list_filter = (
-        'user',
-        'author',
+        input_filter('user__username', 'подписчику'),
+        input_filter('author__username', 'автору'),
     )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def related_count(model, relation):
+    return Coalesce(Subquery(
+        model.objects.filter(**{relation: OuterRef('pk')}).order_by().values(
+            relation
+        ).annotate(value=Count('pk')).values('value')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Subscription = apps.get_model('users', 'Subscription')
+    apps.get_model('users', 'User').objects.update(
+        recipes_count=related_count(
+            apps.get_model('recipes', 'Recipe'), 'author'
+        ),
+        followers_count=related_count(Subscription, 'author'),
+        following_count=related_count(Subscription, 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_counters'),
+        ('users', '0003_user_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписок'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
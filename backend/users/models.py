@@ -1,10 +1,28 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
 
 from api import validators
 from api.constants import LENGTH_EMAIL, LENGTH_USER_NAME
 
 
+class UserQuerySet(models.QuerySet):
+    """Аннотации для выдачи пользователей без запроса на каждую строку."""
+
+    def with_subscription_flag(self, user):
+        if user.is_anonymous:
+            return self.annotate(is_subscribed=Value(
+                False, output_field=models.BooleanField()
+            ))
+        return self.annotate(is_subscribed=Exists(Subscription.objects.filter(
+            user=user, author=OuterRef('pk')
+        )))
+
+
+class FoodgramUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
 
     email = models.EmailField(
@@ -38,6 +56,23 @@ class User(AbstractUser):
         help_text='Введите свой пароль'
 
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписок',
+        default=0,
+        editable=False,
+    )
+    objects = FoodgramUserManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
         'username',
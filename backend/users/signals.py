@@ -0,0 +1,49 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes import catalogue, counters, feed
+from recipes.models import Recipe
+from users.models import Subscription, User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users_version(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    catalogue.bump_on_commit({catalogue.USERS})
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, update_fields=None,
+                            **kwargs):
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    catalogue.bump_on_commit(catalogue.recipe_pages(
+        Recipe.objects.filter(author=instance)
+    ))
+
+
+@receiver(post_save, sender=Subscription)
+def count_subscription(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(User, instance.author_id, 'followers_count')
+        counters.increment(User, instance.user_id, 'following_count')
+
+
+@receiver(post_delete, sender=Subscription)
+def uncount_subscription(sender, instance, **kwargs):
+    counters.decrement(User, instance.author_id, 'followers_count')
+    counters.decrement(User, instance.user_id, 'following_count')
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def trim_feed(sender, instance, **kwargs):
+    feed.trim(instance.user_id, instance.author_id)
+    feed.unfollowed(instance.author_id)